@@ -4,13 +4,24 @@ import sqlite3
 import os
 import hashlib
 import time
-from supabase import create_client, Client
-from docx import Document
-from docx.shared import Inches, Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+import threading
+import tempfile
+import zipfile
+import atexit
 from io import BytesIO
-from datetime import datetime
-from PIL import Image
+from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from repositorio import RepositorioSupabase, RepositorioLocal
+from instrumentacao import Medidor, RepositorioInstrumentado
+from cadastro import Cadastro
+from busca import IndiceBusca, POR_PAGINA as POR_PAGINA_BUSCA
+from coleta_fotos import levantar_orfaos, remover_orfaos, CARENCIA as CARENCIA_COLETA
+from fila_envio import FilaEnvio
+from caches import CacheRelatorios, CacheFotos, MemoDocumentos, INTERVALO_DELTA, POR_PAGINA_EDICAO
+from importacao import ler_planilha, normalizar_cadastro, comparar, importar, COLUNAS as COLUNAS_IMPORTACAO
+from documentos import (gerar_folha_rosto, gerar_relatorio_aula, exportar_monitoramento, BIMESTRES,
+                        LARGURA_FOTO_PERFIL, LARGURA_FOTO_AULA, MAX_THREADS_FOTOS)
 
 # --- 1. CONFIGURAÇÃO COM ÍCONE DE INSTALAÇÃO ---
 st.set_page_config(page_title="AEE Conecta", layout="centered", page_icon="logo.png")
@@ -32,142 +43,405 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# --- 2. CONEXÃO SUPABASE ---
+# --- 2. CONEXÃO COM OS DADOS ---
+# Instrumentação por rerun (painel "⏱️ Desempenho" da gestão). Ligue com AEE_INSTRUMENTACAO=1 ou
+# instrumentacao = true no secrets.toml; desligada, nada é embrulhado.
 try:
-    URL = st.secrets["supabase"]["url"]
-    KEY = st.secrets["supabase"]["key"]
-    supabase: Client = create_client(URL, KEY)
-except:
-    st.error("Erro nas credenciais do Supabase no arquivo secrets.toml.")
-    st.stop()
+    INSTRUMENTACAO = os.environ.get("AEE_INSTRUMENTACAO") == "1" or bool(st.secrets.get("instrumentacao", False))
+except Exception:
+    INSTRUMENTACAO = False
+
+@st.cache_resource
+def obter_medidor():
+    return Medidor()
+
+medidor = obter_medidor() if INSTRUMENTACAO else None
+if medidor:
+    # Rerun que saiu por st.rerun()/st.stop()/exceção não chegou à última linha: fecha aqui, antes de abrir o novo
+    if "rerun_medido" in st.session_state: medidor.finalizar_rerun(st.session_state.rerun_medido, interrompido=True)
+    st.session_state.rerun_medido = medidor.iniciar_rerun()
+
+# Padrão: Supabase (secrets.toml). Com AEE_BACKEND=local (ou backend = "local" no secrets.toml) o app roda
+# inteiro sobre SQLite + disco (repositorio.RepositorioLocal), semeado com cadastro_AEE.xlsx e fotos_alunos/.
+try:
+    BACKEND = os.environ.get("AEE_BACKEND") or st.secrets.get("backend", "supabase")
+except Exception:
+    BACKEND = "supabase"
+
+# O repositório (e o cliente Supabase, com o pool de conexões HTTP dele) é criado uma vez por processo e
+# compartilhado por todas as sessões; os reruns só reaproveitam. O pacote supabase só é importado aqui.
+@st.cache_resource
+def obter_repositorio(backend):
+    if backend == "local":
+        r = RepositorioLocal(os.environ.get("AEE_LOCAL_DB", "aee_local.db"), os.environ.get("AEE_LOCAL_STORAGE", "armazenamento_local"))
+        r.semear_se_vazio("cadastro_AEE.xlsx", "fotos_alunos")
+        return r
+    from supabase import create_client
+    return RepositorioSupabase(create_client(st.secrets["supabase"]["url"], st.secrets["supabase"]["key"]))
+
+if BACKEND == "local":
+    repo = obter_repositorio(BACKEND)
+else:
+    try:
+        repo = obter_repositorio(BACKEND)
+    except:
+        st.error("Erro nas credenciais do Supabase no arquivo secrets.toml.")
+        st.stop()
+
+if medidor:
+    repo = RepositorioInstrumentado(repo, medidor)
+    gerar_folha_rosto = medidor.embrulhar("docx: folha de rosto", gerar_folha_rosto)
+    gerar_relatorio_aula = medidor.embrulhar("docx: relatórios de aula", gerar_relatorio_aula)
+    exportar_monitoramento = medidor.embrulhar("xlsx: monitoramento", exportar_monitoramento)
 
 # Garantir pastas locais
 if not os.path.exists("fotos_alunos"): os.makedirs("fotos_alunos")
+PASTA_CACHE_FOTOS = os.environ.get("AEE_CACHE_FOTOS", os.path.join("fotos_alunos", ".cache"))
 
 # --- 3. FUNÇÕES DE APOIO ---
 def hash_pw(senha):
     return hashlib.sha256(str(senha).encode()).hexdigest()
 
-def registrar_log(rf):
-    try:
-        supabase.table("logs").insert({"rf": rf, "data_hora": datetime.now().strftime('%d/%m/%Y %H:%M:%S')}).execute()
-    except:
-        pass
+# Registro de auditoria (tabela logs): os eventos entram num buffer em memória e uma thread grava em lotes,
+# então login, lançamentos, edições e downloads nunca esperam pelo insert. Lote que falha volta para o buffer.
+INTERVALO_LOGS = 10        # segundos entre descargas
+LOTE_LOGS = 200            # eventos por insert
+MAX_BUFFER_LOGS = 10_000   # com o Supabase fora do ar por muito tempo, os excedentes são descartados
+
+class RegistroEventos:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buffer = deque(maxlen=MAX_BUFFER_LOGS)
+        self.sinal = threading.Event()
+        self.gravados = 0
+        self.falhas = 0
+
+    def registrar(self, rf, acao, detalhe=""):
+        agora = datetime.now()
+        with self.lock:
+            self.buffer.append({"rf": rf, "data_hora": agora.strftime('%d/%m/%Y %H:%M:%S'), "acao": acao,
+                                "semana": (agora.date() - timedelta(days=agora.weekday())).isoformat(), "detalhe": str(detalhe)})
+            if len(self.buffer) >= LOTE_LOGS: self.sinal.set()
+
+    def descarregar(self):
+        while True:
+            with self.lock:
+                lote = [self.buffer.popleft() for _ in range(min(LOTE_LOGS, len(self.buffer)))]
+            if not lote: return
+            try:
+                repo.registrar_logs(lote)
+                self.gravados += len(lote)
+            except Exception:
+                self.falhas += 1
+                with self.lock: self.buffer.extendleft(reversed(lote))
+                return
+
+    def executar(self):
+        while True:
+            self.sinal.wait(INTERVALO_LOGS); self.sinal.clear()
+            self.descarregar()
+
+@st.cache_resource
+def obter_registro_eventos():
+    reg = RegistroEventos()
+    threading.Thread(target=reg.executar, name="aee-logs", daemon=True).start()
+    atexit.register(reg.descarregar)
+    return reg
+
+registro_eventos = obter_registro_eventos()
+
+def registrar_evento(acao, detalhe="", rf=None):
+    registro_eventos.registrar(rf or st.session_state.get("u_rf"), acao, detalhe)
+
+# Atividade semanal por professor (aba Segurança): a soma é feita no banco e guardada num memo próprio, com
+# poucas entradas (uma por número de semanas escolhido) que expiram sozinhas, fora do cache de tabelas.
+TTL_ATIVIDADE = 60  # segundos
+MAX_ATIVIDADE = 4
+
+@st.cache_data(ttl=TTL_ATIVIDADE, max_entries=MAX_ATIVIDADE, show_spinner=False)
+def resumo_atividade(desde):
+    return pd.DataFrame(repo.resumo_logs_semanal(desde))
+
+# Cache das tabelas de cadastro (professores/estudantes), compartilhado entre todas as sessões.
+# Cada rerun lê da memória; só vai ao Supabase quando o TTL vence ou quando o próprio app grava na tabela.
+TTL_CADASTROS = 300  # segundos
+
+class CacheTabelas:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.dados = {}    # tabela -> (instante da carga, DataFrame)
+        self.geracao = {}  # tabela -> contador de invalidações (descarta cargas velhas no meio do caminho; versão das chaves do memo)
+        self.hits = 0
+        self.misses = 0
+
+    def obter(self, tabela, carregar):
+        """Devolve o DataFrame em cache sem cópia: quem recebe não deve alterá-lo."""
+        with self.lock:
+            ent = self.dados.get(tabela)
+            if ent is not None and time.monotonic() - ent[0] < self.ttl:
+                self.hits += 1
+                return ent[1]
+            self.misses += 1
+            ger = self.geracao.get(tabela, 0)
+        df = carregar()
+        with self.lock:
+            if self.geracao.get(tabela, 0) == ger:
+                self.dados[tabela] = (time.monotonic(), df)
+        return df
+
+    def invalidar(self, *tabelas):
+        with self.lock:
+            for t in tabelas:
+                self.dados.pop(t, None)
+                self.geracao[t] = self.geracao.get(t, 0) + 1
+
+@st.cache_resource
+def obter_cache_tabelas():
+    return CacheTabelas(TTL_CADASTROS)
+
+cache_tabelas = obter_cache_tabelas()
 
 def load_professores():
     try:
-        res = supabase.table("professores").select("*").execute()
-        return pd.DataFrame(res.data)
+        return cache_tabelas.obter("professores", lambda: pd.DataFrame(repo.listar_professores()))
     except:
         return pd.DataFrame()
 
 def load_estudantes():
     try:
-        res = supabase.table("estudantes").select("*").execute()
-        return pd.DataFrame(res.data)
+        return cache_tabelas.obter("estudantes", lambda: pd.DataFrame(repo.listar_estudantes()))
     except:
         return pd.DataFrame()
 
-# --- 4. FUNÇÕES DE GERAÇÃO DE WORD ---
-def gerar_folha_rosto(dados):
-    doc = Document()
-    h = doc.add_paragraph(); h.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    h.add_run("CEU EMEF Prof.ª MARA CRISTINA TARTAGLIA SENA\nAEE - ATENDIMENTO EDUCACIONAL ESPECIALIZADO\nREGISTRO - ATIVIDADE FLEXIBILIZADA").bold = True
-    doc.add_paragraph(f"ANO LETIVO {datetime.now().year}").alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    if dados.get('foto_path'):
+# Índices do cadastro (cadastro.py): refeitos só quando uma das duas tabelas é recarregada. Os DataFrames vêm
+# sem cópia, por isso ninguém deve alterá-los; quem precisar de colunas novas trabalha numa cópia.
+@st.cache_resource
+def obter_memo_cadastro():
+    return {}
+
+def load_cadastro():
+    df_a, df_p = load_estudantes(), load_professores()
+    memo = obter_memo_cadastro()
+    atual = memo.get("cadastro")
+    if atual is None or atual.df_alunos is not df_a or atual.df_professores is not df_p:
+        memo["cadastro"] = atual = Cadastro(df_a, df_p)
+    return atual
+
+# Cache de leitura da tabela relatorios (caches.py), compartilhado entre sessões e indexado por aluno e por
+# professor. Depois da primeira carga só vêm as linhas alteradas e as lápides; trocar de aluno não vai ao Supabase.
+@st.cache_resource
+def obter_cache_relatorios():
+    return CacheRelatorios(repo, INTERVALO_DELTA)
+
+cache_rels = obter_cache_relatorios()
+
+@st.cache_resource
+def obter_indice_busca():
+    indice = IndiceBusca()
+    cache_rels.assinar(indice.aplicar)
+    return indice
+
+# Cache em disco das fotos do Storage (caches.py): original para os .docx e miniatura para os avatares.
+LIMITE_CACHE_FOTOS = 300 * 1024 * 1024  # bytes
+
+# Pipeline de entrada das fotos: tudo que vem do st.file_uploader passa por aqui antes do Storage.
+# Corrige a rotação do celular (EXIF), reduz à resolução máxima de impressão da largura usada no .docx,
+# regrava em JPEG compacto e descarta os metadados (EXIF/GPS/ICC).
+DPI_IMPRESSAO = 300
+
+class FotoInvalida(ValueError):
+    """Arquivo que o Pillow não reconhece como imagem (PDF, HEIC do iPhone, arquivo corrompido)."""
+
+def normalizar_imagem(bruto, largura_pol):
+    from PIL import Image, ImageOps  # Pillow só é carregado quando há foto para processar
+    try:
+        img = ImageOps.exif_transpose(Image.open(BytesIO(bruto)))
+        img.load()
+    except (OSError, Image.DecompressionBombError) as e:  # UnidentifiedImageError é um OSError
+        raise FotoInvalida("Foto não reconhecida: envie uma imagem PNG ou JPG.") from e
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        fundo = Image.new("RGB", img.size, (255, 255, 255)); fundo.paste(img, mask=img.getchannel("A")); img = fundo
+    img = img.convert("RGB")
+    lado = int(largura_pol * DPI_IMPRESSAO)
+    if img.width > lado:
+        img = img.resize((lado, max(1, round(img.height * lado / img.width))), Image.LANCZOS)
+    buf = BytesIO(); img.save(buf, "JPEG", quality=82, optimize=True, progressive=True)
+    return buf.getvalue(), ".jpg", "image/jpeg"
+
+def fmt_bytes(n):
+    for un in ("B", "KB", "MB"):
+        if abs(n) < 1024: return f"{n:.0f} {un}" if un == "B" else f"{n:.1f} {un}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+def enviar_foto(bucket, nome_base, arquivo, largura_pol, upsert=False):
+    """Normaliza a foto enviada e grava no Storage. Retorna (caminho, texto com a economia obtida)."""
+    bruto = arquivo.getvalue()
+    dados, ext, tipo = normalizar_imagem(bruto, largura_pol)
+    caminho = f"{nome_base}{ext}"
+    repo.gravar_foto(bucket, caminho, dados, tipo, upsert)
+    return caminho, f"📉 Foto otimizada: {fmt_bytes(len(bruto))} → {fmt_bytes(len(dados))} (-{fmt_bytes(len(bruto) - len(dados))})"
+
+@st.cache_resource
+def obter_cache_fotos():
+    return CacheFotos(PASTA_CACHE_FOTOS, LIMITE_CACHE_FOTOS, repo.baixar_foto)
+
+cache_fotos = obter_cache_fotos()
+
+# Fila local de envio (fila_envio.py): o "Salvar" grava no SQLite local e uma thread envia em segundo plano.
+ARQUIVO_FILA = os.environ.get("AEE_FILA_DB", "aee_fila.db")
+
+@st.cache_resource
+def obter_fila_envio():
+    fila = FilaEnvio(ARQUIVO_FILA, repo)
+    threading.Thread(target=fila.executar, name="aee-sincronia", daemon=True).start()
+    return fila
+
+fila_envio = obter_fila_envio()
+fila_envio.ao_enviar = cache_rels.marcar_sujo
+
+# --- 4. FUNÇÕES DE GERAÇÃO DE WORD (montagem em documentos.py) ---
+# Memória dos .docx já gerados (compartilhada entre sessões). Os documentos só são montados quando alguém
+# pede; a chave muda sempre que o conteúdo de origem muda, então nunca se entrega um arquivo desatualizado.
+LIMITE_MEMO_DOCX = 100 * 1024 * 1024  # bytes
+
+@st.cache_resource
+def obter_memo_documentos():
+    return MemoDocumentos(LIMITE_MEMO_DOCX)
+
+memo_docs = obter_memo_documentos()
+
+def _assinatura(valores):
+    return hashlib.sha1(repr(valores).encode()).hexdigest()
+
+def chave_folha_rosto(dados):
+    # A foto de perfil é regravada no mesmo caminho, por isso entra na chave a geração do cadastro: ela só muda
+    # em invalidar() (gravações e troca de foto), não a cada recarga do TTL
+    return ("rosto", str(dados.get('registro')), datetime.now().year, _assinatura(tuple(str(v) for v in dict(dados).values())), cache_tabelas.geracao.get("estudantes", 0))
+
+def chave_relatorio_aula(registro, bimestre, df_rels):
+    col_stamp = next((c for c in ("updated_at", "atualizado_em") if c in df_rels.columns), None)
+    if col_stamp:
+        itens = tuple(zip(df_rels['id'].astype(str), df_rels[col_stamp].astype(str)))
+    else:
+        itens = tuple(zip(df_rels['id'].astype(str), (_assinatura(tuple(r)) for r in df_rels.astype(str).itertuples(index=False))))
+    return ("relatos", str(registro), bimestre, datetime.now().year, itens, cache_tabelas.geracao.get("professores", 0))
+
+def botao_documento(col, rotulo, chave, gerar, nome_arquivo, key):
+    dados = memo_docs.consultar(chave)
+    if dados is None and col.button(f"⚙️ Gerar {rotulo}", key=f"gerar_{key}"):
+        with st.spinner("Gerando documento..."):
+            dados = memo_docs.obter(chave, lambda: gerar().getvalue())
+    if dados is not None:
+        col.download_button(f"📥 Baixar {rotulo}", dados, nome_arquivo, key=f"baixar_{key}", on_click=registrar_evento, args=("download", nome_arquivo))
+
+# Exportação em lote: Rosto_*.docx e Relatos_*.docx de todos os estudantes de uma turma/bimestre num único ZIP.
+# Os documentos são montados num pool de threads com no máximo MAX_PENDENTES_LOTE prontos em memória;
+# cada um é gravado no ZIP (em disco) assim que termina, então a memória não cresce com o número de alunos.
+MAX_THREADS_LOTE = 4
+MAX_PENDENTES_LOTE = 2 * MAX_THREADS_LOTE
+# O ZIP fica no disco, não na sessão: o botão recebe uma função que só lê o arquivo quando o usuário clica
+# (download adiado do Streamlit), então os reruns do Painel não carregam nada. Depois de lido o arquivo é apagado;
+# ZIP gerado e nunca baixado (sessão fechada) é apagado pela varredura feita a cada nova exportação.
+PREFIXO_ZIP_LOTE = "aee_lote_"
+VALIDADE_ZIP_LOTE = 3600  # segundos
+
+def _nome_arquivo(texto):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in str(texto)).strip('_') or "sem_nome"
+
+def varrer_zips_lote(validade=VALIDADE_ZIP_LOTE):
+    limite = time.time() - validade
+    for nome in os.listdir(tempfile.gettempdir()):
+        caminho = os.path.join(tempfile.gettempdir(), nome)
         try:
-            res_foto = supabase.storage.from_("fotos_perfil").download(dados['foto_path'])
-            doc.add_picture(BytesIO(res_foto), width=Inches(2.5))
-            doc.paragraphs[-1].alignment = WD_ALIGN_PARAGRAPH.CENTER
-        except:
+            if nome.startswith(PREFIXO_ZIP_LOTE) and nome.endswith(".zip") and os.path.getmtime(caminho) < limite: os.remove(caminho)
+        except OSError:
             pass
 
-    t = doc.add_table(rows=4, cols=1); t.style = 'Table Grid'
-    t.rows[0].cells[0].text = f"ESTUDANTE: {dados.get('aluno', 'N/A')}"
-    t.rows[1].cells[0].text = f"TURMA: {dados.get('turma', 'N/A')}"
-    col_nec = next((x for x in list(dados.index) if "nec" in x), "necessidades")
-    t.rows[2].cells[0].text = f"DEFICIÊNCIA/CONDIÇÃO: {dados.get(col_nec, 'N/A')}"
-    t.rows[3].cells[0].text = f"DATA DE NASCIMENTO: {dados.get('data_nascimento', 'N/A')}"
-    
-    doc.add_heading('PERFIL E OBSERVAÇÕES DO PROFESSOR PAEE:', level=3)
-    doc.add_paragraph(str(dados.get('observacoes_gerais', '')))
-    
-    buf = BytesIO(); doc.save(buf); buf.seek(0); return buf
-
-def gerar_relatorio_aula(df_rels, nome_aluno, turma_aluno, df_professores):
-    doc = Document()
-    for i, row in df_rels.iterrows():
-        rf_aula = row['rf_professor']
-        filtro_p = df_professores[df_professores['rf'] == rf_aula]
-        nome_p = filtro_p.iloc[0]['nome'] if not filtro_p.empty else "Professor não identificado"
-
-        h = doc.add_paragraph(); h.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        h.add_run("CEU EMEF Prof.ª MARA CRISTINA TARTAGLIA SENA\nAEE - ATENDIMENTO EDUCACIONAL ESPECIALIZADO\nREGISTRO - ATIVIDADE FLEXIBILIZADA").bold = True
-        p_title = doc.add_paragraph(); p_title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        p_title.add_run(f"{row['bimestre']} – ANO LETIVO {datetime.now().year}").bold = True
-        
-        doc.add_paragraph(f"ESTUDANTE: {nome_aluno}\nTURMA: {turma_aluno}")
-        doc.add_paragraph(f"PROFESSOR: {nome_p} | DISCIPLINA/TEMA: {row.get('disciplina_tema', 'N/A')}")
-        
-        p_sim = "x" if row.get('participou_aula') == "Sim" else " "
-        p_nao = "x" if row.get('participou_aula') == "Não" else " "
-        txt_part = doc.add_paragraph(f"O ESTUDANTE PARTICIPOU DA SUA AULA? ( {p_sim} ) SIM ( {p_nao} ) NÃO.")
-        if row.get('participou_aula') == "Não":
-            txt_part.add_run(f" RELATE O MOTIVO: {row.get('motivo_nao_participou', '')}")
-            
-        doc.add_heading('ATIVIDADES PLANEJADAS:', level=3); doc.add_paragraph(str(row['planejado']))
-        doc.add_heading('ATIVIDADE REALIZADA COM O ESTUDANTE:', level=3); doc.add_paragraph(str(row['realizado']))
-        
-        if row['foto_path']:
-            try:
-                res_foto = supabase.storage.from_("fotos_aee").download(row['foto_path'])
-                doc.add_picture(BytesIO(res_foto), width=Inches(3.5)); doc.paragraphs[-1].alignment = WD_ALIGN_PARAGRAPH.CENTER
-            except: pass
-        
-        doc.add_heading('COMO FOI A PARTICIPAÇÃO DO ESTUDANTE?', level=3)
-        parts = str(row['participacao']).split(", ")
-        opcoes = ["REALIZOU COM AUTONOMIA", "REALIZOU COM APOIO E INTERVENÇÃO DE UM ADULTO", "REALIZOU WITH APOIO DE UM COLEGA", "NÃO REALIZOU"]
-        for op in opcoes:
-            check = "x" if op in parts else " "
-            doc.add_paragraph(f"( {check} ) {op}")
-        
-        doc.add_paragraph(f"\nDATA DE REALIZAÇÃO DA ATIVIDADE: {row['data']}")
-        if i < len(df_rels) - 1: doc.add_page_break()
-    buf = BytesIO(); doc.save(buf); buf.seek(0); return buf
+def ler_zip_lote(caminho, nome, rf):
+    """Dados do botão de download, chamados no clique fora do script: lê o ZIP, apaga do disco e registra."""
+    def ler():
+        with open(caminho, "rb") as f: dados = f.read()
+        os.remove(caminho)
+        registro_eventos.registrar(rf, "download", nome)
+        return dados
+    return ler
+
+def exportar_lote_zip(df_est, df_rels, bimestre, nomes_professores, progresso=None):
+    """Grava o ZIP num arquivo temporário e devolve o caminho. progresso(feitos, total) é chamado a cada aluno."""
+    grupos = {reg: g for reg, g in df_rels.groupby(df_rels['registro_aluno'].astype(str))} if not df_rels.empty else {}
+    tarefas = []
+    for _, al in df_est.iterrows():
+        reg = str(al['registro'])
+        g = grupos.get(reg)
+        tarefas.append((al, chave_folha_rosto(al), g, chave_relatorio_aula(reg, bimestre, g) if g is not None else None))
+
+    def montar(al, ch_rosto, g, ch_rel):
+        rosto = memo_docs.consultar(ch_rosto) or gerar_folha_rosto(al, cache_fotos.original).getvalue()
+        relatos = None
+        if g is not None:
+            relatos = memo_docs.consultar(ch_rel) or gerar_relatorio_aula(g, al['aluno'], al['turma'], nomes_professores, cache_fotos.original).getvalue()
+        return al, rosto, relatos
+
+    tmp = tempfile.NamedTemporaryFile(delete=False, prefix=PREFIXO_ZIP_LOTE, suffix=".zip"); tmp.close()
+    feitos, fila = 0, iter(tarefas)
+    with zipfile.ZipFile(tmp.name, "w", zipfile.ZIP_STORED) as zf, ThreadPoolExecutor(max_workers=MAX_THREADS_LOTE) as pool:
+        pendentes = set()
+        while True:
+            while len(pendentes) < MAX_PENDENTES_LOTE:
+                t = next(fila, None)
+                if t is None: break
+                pendentes.add(pool.submit(montar, *t))
+            if not pendentes: break
+            prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for fut in prontos:
+                al, rosto, relatos = fut.result()
+                pasta, base = _nome_arquivo(al['turma']), f"{_nome_arquivo(al['aluno'])}_{al['registro']}"
+                zf.writestr(f"{pasta}/Rosto_{base}.docx", rosto)
+                if relatos: zf.writestr(f"{pasta}/Relatos_{base}.docx", relatos)
+                feitos += 1
+                if progresso: progresso(feitos, len(tarefas))
+    return tmp.name
+
+if medidor: exportar_lote_zip = medidor.embrulhar("zip: exportação em lote", exportar_lote_zip)
 
 # --- 5. LÓGICA DE LOGIN ---
-df_prof = load_professores()
+cad = load_cadastro()
+df_prof = cad.df_professores
 
 if "logged_in" not in st.session_state: st.session_state.logged_in = False
 if "change_pw" not in st.session_state: st.session_state.change_pw = False
 
+if medidor: medidor.marcar_pagina("Login")
 if not st.session_state.logged_in:
     st.title("💠 AEE Conecta - Login")
     rf_in = st.text_input("RF").strip()
     pw_in = st.text_input("Senha", type="password").strip()
 
     if st.button("Entrar"):
-        if df_prof.empty:
-            supabase.table("professores").insert({"rf": rf_in, "nome": "Gestor Mestre", "perfil": "gestao"}).execute()
+        if not cad.professores:
+            repo.inserir_professor({"rf": rf_in, "nome": "Gestor Mestre", "perfil": "gestao"})
+            cache_tabelas.invalidar("professores")
             st.rerun()
         
-        user_db = df_prof[df_prof['rf'] == rf_in]
-        if not user_db.empty:
-            res_creds = supabase.table("credenciais").select("senha_hash").eq("rf", rf_in).execute()
+        user_db = cad.professor(rf_in)
+        if user_db is not None:
+            senha_hash = repo.obter_senha_hash(rf_in)
             
-            if not res_creds.data:
+            if senha_hash is None:
                 if pw_in == rf_in:
                     st.session_state.change_pw, st.session_state.temp_rf = True, rf_in
                     st.rerun()
                 else:
                     st.warning("Primeiro acesso? Use seu RF como senha.")
             else:
-                if hash_pw(pw_in) == res_creds.data[0]['senha_hash']:
+                if hash_pw(pw_in) == senha_hash:
                     st.session_state.logged_in, st.session_state.u_rf = True, rf_in
-                    st.session_state.u_nome = user_db.iloc[0]['nome']
-                    st.session_state.u_perfil = str(user_db.iloc[0]['perfil']).lower().strip().replace('çã', 'ca')
-                    registrar_log(rf_in); st.rerun()
+                    st.session_state.u_nome = user_db['nome']
+                    st.session_state.u_perfil = str(user_db['perfil']).lower().strip().replace('çã', 'ca')
+                    registrar_evento("login", rf=rf_in); st.rerun()
                 else:
                     st.error("Senha incorreta.")
         else:
@@ -180,7 +454,7 @@ if not st.session_state.logged_in:
         c_pw = st.text_input("Confirme a Senha", type="password")
         if st.button("Salvar Nova Senha"):
             if len(n_pw) >= 6 and n_pw == c_pw:
-                supabase.table("credenciais").insert({"rf": st.session_state.temp_rf, "senha_hash": hash_pw(n_pw)}).execute()
+                repo.inserir_credencial(st.session_state.temp_rf, hash_pw(n_pw))
                 st.session_state.change_pw = False
                 st.toast("✅ Senha cadastrada!")
                 time.sleep(1.5); st.rerun()
@@ -189,11 +463,20 @@ if not st.session_state.logged_in:
 
 else:
     # --- 6. INTERFACE LOGADA ---
-    df_alunos = load_estudantes()
+    df_alunos = cad.df_alunos
     st.sidebar.title(f"Olá, {st.session_state.u_nome}")
     menu = st.sidebar.radio("Navegação", ["Início", "Lançar Relatório", "Painel de Documentos", "Sair"])
+    if medidor: medidor.marcar_pagina(menu)
     if menu == "Sair": st.session_state.logged_in = False; st.rerun()
     super_perfis = ["gestao", "gestor", "paee", "direcao", "coordenador"]
+    for aviso in st.session_state.pop("avisos", []): st.toast(aviso)
+    pendentes, enviados = fila_envio.contagem()
+    st.sidebar.caption(f"⏳ Pendentes: {pendentes} | ✅ Sincronizados: {enviados}")
+    com_erro = [i for i in fila_envio.com_erro() if st.session_state.u_perfil in super_perfis or str(i.get('rf_professor')) == str(st.session_state.u_rf)]
+    if com_erro:  # recusados pelo servidor ou com a foto presa: seguem na fila, mas o usuário precisa saber
+        with st.sidebar.expander(f"⚠️ {len(com_erro)} relatório(s) com erro de envio"):
+            for i in com_erro:
+                st.caption(f"**{cad.rotulo(i.get('registro_aluno'))}** · {i.get('data')} · {i['tentativas']} tentativa(s)  \n{i['erro']}")
 
     # --- INÍCIO ---
     if menu == "Início":
@@ -232,21 +515,73 @@ else:
 
         if df_alunos.empty:
             st.warning("Aguardando cadastro de alunos pela Gestão/PAEE.")
+        elif st.radio("Modo de lançamento:", ["Individual", "Turma inteira"], horizontal=True, key="modo_lanc") == "Turma inteira":
+            # LANÇAMENTO EM LOTE: Tema/Planejado/Data/Bimestre uma vez, parecer por aluno numa grade.
+            # Tudo vai para a fila de envio numa única transação e segue como um só insert.
+            turma_lote = st.selectbox("1. Turma:", cad.turmas, key="turma_lanc_lote")
+            with st.form(key=f"f_lote_{st.session_state.form_reset_key}"):
+                col1, col2 = st.columns(2)
+                dt = col1.date_input("Data da Atividade", datetime.now())
+                bm = col2.selectbox("Bimestre", BIMESTRES)
+                tm = st.text_input("Disciplina ou Tema da Aula", value=st.session_state.tema_val)
+                pl = st.text_area("Atividades Planejadas", value=st.session_state.plan_val)
+                st.divider()
+                st.subheader(f"📝 Pareceres - Turma {turma_lote}")
+                grade = []
+                for reg in cad.por_turma[turma_lote]:
+                    al = cad.alunos[reg]
+                    with st.container(border=True):
+                        c_in, c_pa = st.columns([3, 2])
+                        incluir = c_in.checkbox(f"**{al['aluno']}** ({reg})", value=True, key=f"lt_in_{reg}_{st.session_state.form_reset_key}")
+                        p_a = c_pa.radio("Participou?", ["Sim", "Não"], horizontal=True, key=f"lt_pa_{reg}_{st.session_state.form_reset_key}")
+                        re = st.text_area("Atividades Realizadas / motivo da não participação", key=f"lt_re_{reg}_{st.session_state.form_reset_key}", height=68)
+                        pn = st.multiselect("Nível de Participação:", ["REALIZOU COM AUTONOMIA", "APOIO ADULTO", "APOIO COLEGA", "NÃO REALIZOU"], key=f"lt_pn_{reg}_{st.session_state.form_reset_key}")
+                        ft = st.file_uploader("Foto", type=['png', 'jpg', 'jpeg'], key=f"lt_ft_{reg}_{st.session_state.form_reset_key}")
+                        if incluir: grade.append((reg, p_a, re, pn, ft))
+                replicar = st.checkbox("Manter 'Tema' e 'Planejado' para o próximo registro?", value=True)
+                salvar_lote = st.form_submit_button("💾 Salvar Relatórios da Turma")
+            if salvar_lote:
+                try:
+                    with ThreadPoolExecutor(max_workers=MAX_THREADS_FOTOS) as pool:
+                        fotos = list(pool.map(lambda g: normalizar_imagem(g[4].getvalue(), LARGURA_FOTO_AULA) if g[4] else None, grade))
+                except FotoInvalida as e:
+                    fotos = e
+                if not tm or not pl:
+                    st.error("Preencha o Tema e o Planejamento.")
+                elif not grade:
+                    st.error("Nenhum estudante selecionado.")
+                elif isinstance(fotos, FotoInvalida):
+                    st.error(str(fotos))
+                else:
+                    carimbo = datetime.now().strftime('%Y%m%d%H%M%S')
+                    itens = []
+                    for (reg, p_a, re, pn, ft), foto in zip(grade, fotos):
+                        itens.append(({
+                            "data": dt.strftime('%d/%m/%Y'), "rf_professor": st.session_state.u_rf,
+                            "registro_aluno": reg, "bimestre": bm, "participou_aula": p_a,
+                            "motivo_nao_participou": re if p_a == "Não" else "", "disciplina_tema": tm, "planejado": pl,
+                            "realizado": re if p_a == "Sim" else "", "participacao": ", ".join(pn) if p_a == "Sim" else "",
+                            "foto_path": f"aula_{carimbo}_{reg}{foto[1]}" if foto else ""
+                        }, foto[0] if foto else None, foto[2] if foto else None))
+                    fila_envio.enfileirar(itens)
+                    for linha, _, _ in itens: registrar_evento("relatorio_lancado", linha["registro_aluno"])
+                    st.session_state.tema_val, st.session_state.plan_val = (tm, pl) if replicar else ("", "")
+                    st.session_state.avisos = [f"✅ {len(itens)} registros da turma {turma_lote} salvos!"]
+                    st.session_state.form_reset_key += 1
+                    st.rerun()
         else:
             # 1. FILTRO POR TURMA
-            lista_turmas = ["Todas"] + sorted(df_alunos['turma'].unique().tolist())
+            lista_turmas = ["Todas"] + cad.turmas
             turma_sel = st.selectbox("1. Filtrar por Turma:", lista_turmas)
             
-            df_f = df_alunos[df_alunos['turma'] == turma_sel].copy() if turma_sel != "Todas" else df_alunos.copy()
-            df_f['exibicao'] = df_f['aluno'] + " - " + df_f['turma']
-            
-            # 2. SELEÇÃO DO ESTUDANTE
-            lista_est = ["Selecione o Estudante..."] + sorted(df_f['exibicao'].tolist())
-            al_sel_visual = st.selectbox("2. Escolha o aluno:", lista_est, key=f"al_sel_{st.session_state.form_reset_key}")
+            # 2. SELEÇÃO DO ESTUDANTE (valor = registro; o rótulo é só exibição)
+            lista_est = [None] + (cad.registros if turma_sel == "Todas" else cad.por_turma.get(turma_sel, []))
+            reg_sel = st.selectbox("2. Escolha o aluno:", lista_est, format_func=lambda r: "Selecione o Estudante..." if r is None else cad.rotulo(r),
+                                   key=f"al_sel_{st.session_state.form_reset_key}")
 
-            if al_sel_visual != "Selecione o Estudante...":
-                nome_puro = al_sel_visual.split(" - ")[0]
-                al_inf = df_alunos[df_alunos['aluno'] == nome_puro].iloc[0]
+            if reg_sel is not None:
+                al_inf = cad.aluno(reg_sel)
+                nome_puro = al_inf['aluno']
                 
                 with st.container(border=True):
                     # --- NOVO: IDENTIFICAÇÃO VISUAL DO ALUNO ---
@@ -255,8 +590,8 @@ else:
                     with col_foto:
                         if al_inf.get('foto_path'):
                             try:
-                                # Busca a foto oficial do perfil (fotos_perfil)
-                                res_foto = supabase.storage.from_("fotos_perfil").download(al_inf['foto_path'])
+                                # Busca a miniatura da foto oficial do perfil (fotos_perfil), via cache local
+                                res_foto = cache_fotos.miniatura("fotos_perfil", al_inf['foto_path'])
                                 st.image(BytesIO(res_foto), width=100) # Tamanho pequeno mas visível
                             except:
                                 st.write("🖼️ (Erro na foto)")
@@ -302,28 +637,36 @@ else:
                     replicar = st.checkbox("Manter 'Tema' e 'Planejado' para o próximo registro?", value=True)
 
                     if st.button("💾 Salvar Relatório Individual"):
+                        try:
+                            foto, ext, tipo = normalizar_imagem(ft.getvalue(), LARGURA_FOTO_AULA) if ft else (None, "", None)
+                        except FotoInvalida as e:
+                            foto = e
                         if not tm or not pl:
                             st.error("Preencha o Tema e o Planejamento.")
+                        elif isinstance(foto, FotoInvalida):
+                            st.error(str(foto))
                         else:
                             p_f = ""
+                            avisos = [f"✅ Registro de {nome_puro} salvo!"]
                             if ft:
-                                p_f = f"aula_{datetime.now().strftime('%Y%m%d%H%M%S')}_{al_inf['registro']}.png"
-                                supabase.storage.from_("fotos_aee").upload(p_f, ft.getvalue())
+                                p_f = f"aula_{datetime.now().strftime('%Y%m%d%H%M%S')}_{al_inf['registro']}{ext}"
+                                avisos.append(f"📉 Foto otimizada: {fmt_bytes(len(ft.getvalue()))} → {fmt_bytes(len(foto))}")
                             
-                            supabase.table("relatorios").insert({
+                            # Grava na fila local; o envio ao Supabase acontece em segundo plano
+                            fila_envio.enfileirar([({
                                 "data": dt.strftime('%d/%m/%Y'), "rf_professor": st.session_state.u_rf, 
                                 "registro_aluno": str(al_inf['registro']), "bimestre": bm, "participou_aula": p_a, 
                                 "motivo_nao_participou": mot, "disciplina_tema": tm, "planejado": pl, 
                                 "realizado": re, "participacao": ", ".join(pn), "foto_path": p_f
-                            }).execute()
+                            }, foto, tipo)])
+                            registrar_evento("relatorio_lancado", al_inf['registro'])
                             
                             if replicar:
                                 st.session_state.tema_val, st.session_state.plan_val = tm, pl
                             else:
                                 st.session_state.tema_val, st.session_state.plan_val = "", ""
                             
-                            st.toast(f"✅ Registro de {nome_puro} salvo!")
-                            time.sleep(1)
+                            st.session_state.avisos = avisos  # exibidos no próximo rerun, sem time.sleep
                             st.session_state.form_reset_key += 1
                             st.rerun()
 
@@ -336,6 +679,8 @@ else:
         list_tabs = ["📄 Documentos", "✏️ Alterar ou Excluir"]
         if st.session_state.u_perfil in super_perfis:
             list_tabs += ["👤 Gestão de Alunos", "👥 Gestão de Professores", "🔒 Segurança e Reset"]
+            if medidor: list_tabs.append("⏱️ Desempenho")
+            list_tabs += ["🔎 Busca nos Relatórios", "📦 Exportação em Lote"]
         
         abas = st.tabs(list_tabs)
 
@@ -344,27 +689,26 @@ else:
             if df_alunos.empty:
                 st.info("Nenhum aluno cadastrado no sistema.")
             else:
-                df_alunos['exibicao_imp'] = df_alunos['aluno'] + " - " + df_alunos['turma']
-                al_f_v = st.selectbox("Selecione o Aluno para Documentos:", sorted(df_alunos['exibicao_imp'].tolist()), key="sel_doc_imp")
-                al_f_nome = al_f_v.split(" - ")[0]
-                d_f = df_alunos[df_alunos['aluno'] == al_f_nome].iloc[0]
+                reg_doc = st.selectbox("Selecione o Aluno para Documentos:", cad.registros, format_func=cad.rotulo, key="sel_doc_imp")
+                d_f = cad.aluno(reg_doc)
+                al_f_nome = d_f['aluno']
                 
                 c1, c2 = st.columns(2)
-                c1.download_button("📥 Baixar Folha de Rosto", gerar_folha_rosto(d_f), f"Rosto_{al_f_nome}.docx")
+                botao_documento(c1, "Folha de Rosto", chave_folha_rosto(d_f), lambda: gerar_folha_rosto(d_f, cache_fotos.original), f"Rosto_{al_f_nome}.docx", "rosto")
                 
                 # Regra de Visualização: Gestão vê tudo, Professor só vê o dele
-                query = supabase.table("relatorios").select("*").eq("registro_aluno", str(d_f['registro']))
-                if st.session_state.u_perfil not in super_perfis:
-                    query = query.eq("rf_professor", st.session_state.u_rf)
-                
-                res = query.execute()
-                df_res = pd.DataFrame(res.data)
+                rf_filtro = None if st.session_state.u_perfil in super_perfis else st.session_state.u_rf
+                df_res = pd.DataFrame(cache_rels.do_aluno(d_f['registro'], rf_filtro))
                 
                 if not df_res.empty:
                     bim_f = st.selectbox("Filtrar Bimestre para Impressão:", ["Todos", "1º Bimestre", "2º Bimestre", "3º Bimestre", "4º Bimestre"])
                     if bim_f != "Todos": df_res = df_res[df_res['bimestre'] == bim_f]
                     if not df_res.empty:
-                        c2.download_button(f"📥 Baixar Relatórios ({len(df_res)})", gerar_relatorio_aula(df_res, al_f_nome, d_f['turma'], df_prof), f"Relatos_{al_f_nome}.docx")
+                        tempos_rel = {}
+                        botao_documento(c2, f"Relatórios ({len(df_res)})", chave_relatorio_aula(d_f['registro'], bim_f, df_res),
+                                        lambda: gerar_relatorio_aula(df_res, al_f_nome, d_f['turma'], cad.nomes_professores, cache_fotos.original, tempos_rel), f"Relatos_{al_f_nome}.docx", "relatos")
+                        if tempos_rel:
+                            c2.caption(f"⏱️ Fotos ({tempos_rel['fotos']}, {tempos_rel['fotos_falhas']} indisponíveis): {tempos_rel['busca_fotos']:.2f}s | Montagem: {tempos_rel['montagem']:.2f}s")
                 else:
                     st.warning("Sem relatórios disponíveis para impressão conforme seu perfil.")
 
@@ -373,66 +717,127 @@ else:
             st.subheader("Gerenciar Meus Registros")
             st.write("Aqui você pode corrigir erros ou excluir aulas lançadas por você.")
             
-            al_ed_v = st.selectbox("Selecione o Aluno para ver seus relatórios:", ["Selecione..."] + sorted(df_alunos['exibicao_imp'].tolist()), key="sel_edit_rel")
+            reg_ed = st.selectbox("Selecione o Aluno para ver seus relatórios:", [None] + cad.registros,
+                                  format_func=lambda r: "Selecione..." if r is None else cad.rotulo(r), key="sel_edit_rel")
             
-            if al_ed_v != "Selecione...":
-                nome_p_ed = al_ed_v.split(" - ")[0]
-                al_inf_ed = df_alunos[df_alunos['aluno'] == nome_p_ed].iloc[0]
-                
-                # Busca relatórios que o usuário logado PODE editar
-                q_ed = supabase.table("relatorios").select("*").eq("registro_aluno", str(al_inf_ed['registro']))
-                if st.session_state.u_perfil not in super_perfis:
-                    q_ed = q_ed.eq("rf_professor", st.session_state.u_rf)
+            if reg_ed is not None:
+                # Lista só a projeção (id, data, bimestre, tema) dos relatórios que o usuário logado PODE editar;
+                # o registro completo (textos e foto) é lido do banco só quando o usuário clica em Abrir.
+                rf_filtro = None if st.session_state.u_perfil in super_perfis else st.session_state.u_rf
+                cf1, cf2 = st.columns(2)
+                bim_ed = cf1.selectbox("Bimestre:", ["Todos"] + BIMESTRES, key="bim_edit")
+                periodo_ed = cf2.date_input("Período (opcional):", value=(), format="DD/MM/YYYY", key="periodo_edit")
+                de_ed = periodo_ed[0] if len(periodo_ed) > 0 else None
+                ate_ed = periodo_ed[1] if len(periodo_ed) > 1 else None
+                if st.session_state.get("filtros_edit") != (reg_ed, bim_ed, de_ed, ate_ed):
+                    st.session_state.filtros_edit, st.session_state.pag_edit = (reg_ed, bim_ed, de_ed, ate_ed), 0
+                total_ed, st.session_state.pag_edit, resumo_ed = cache_rels.resumo_do_aluno(reg_ed, rf_filtro, bim_ed if bim_ed != "Todos" else None, de_ed, ate_ed,
+                                                                                           st.session_state.pag_edit, POR_PAGINA_EDICAO)
                 
-                df_ed = pd.DataFrame(q_ed.execute().data)
-                
-                if df_ed.empty:
-                    st.info("Nenhum registro seu encontrado para este aluno.")
+                if not resumo_ed:
+                    st.info("Nenhum registro seu encontrado para este aluno com esses filtros.")
                 else:
-                    df_ed['label'] = df_ed['data'] + " - " + df_ed['disciplina_tema']
-                    rel_sel_label = st.selectbox("Escolha o registro para alterar:", df_ed['label'].tolist())
-                    rel_data = df_ed[df_ed['label'] == rel_sel_label].iloc[0]
-                    
-                    with st.form("form_correcao_aula"):
-                        st.warning(f"Modo Edição: Aula de {rel_data['data']}")
-                        new_tm = st.text_input("Tema/Disciplina", value=rel_data['disciplina_tema'])
-                        new_pl = st.text_area("Atividades Planejadas", value=rel_data['planejado'])
-                        new_re = st.text_area("Atividades Realizadas", value=rel_data['realizado'])
-                        new_pa = st.radio("Participou?", ["Sim", "Não"], index=0 if rel_data['participou_aula'] == "Sim" else 1)
-                        new_pn = st.multiselect("Nível:", ["REALIZOU COM AUTONOMIA", "APOIO ADULTO", "APOIO COLEGA", "NÃO REALIZOU"], default=str(rel_data['participacao']).split(", "))
-                        new_ft = st.file_uploader("Substituir foto (opcional)")
+                    rotulos_ed = {r['id']: f"{r['data']} - {r['disciplina_tema']} ({r['bimestre']})" for r in resumo_ed}
+                    id_ed = st.selectbox(f"Escolha o registro para alterar ({total_ed} encontrado(s)):", list(rotulos_ed), format_func=rotulos_ed.get)
+                    paginas_ed = -(-total_ed // POR_PAGINA_EDICAO)
+                    if paginas_ed > 1:
+                        pe1, pe2, pe3 = st.columns([1, 2, 1])
+                        if pe1.button("◀ Mais recentes", disabled=st.session_state.pag_edit == 0):
+                            st.session_state.pag_edit -= 1; st.rerun()
+                        pe2.caption(f"Página {st.session_state.pag_edit + 1} de {paginas_ed}")
+                        if pe3.button("Mais antigos ▶", disabled=st.session_state.pag_edit >= paginas_ed - 1):
+                            st.session_state.pag_edit += 1; st.rerun()
+                    aberto = st.session_state.get("rel_aberto")  # (id, linha completa) lida no clique em Abrir
+                    if (aberto is None or aberto[0] != id_ed) and st.button("📂 Abrir registro"):
+                        aberto = st.session_state.rel_aberto = (id_ed, repo.obter_relatorio(id_ed))
+                    rel_data = aberto[1] if aberto is not None and aberto[0] == id_ed else None
+                    if aberto is None or aberto[0] != id_ed:
+                        st.caption("Abra o registro para ver e corrigir os textos e a foto.")
+                    elif rel_data is None or (rf_filtro is not None and str(rel_data['rf_professor']) != str(rf_filtro)):
+                        cache_rels.marcar_sujo()
+                        st.warning("Este registro foi excluído ou alterado por outra pessoa. Atualize a página.")
+                    else:
+                        with st.form(f"form_correcao_aula_{id_ed}"):
+                            st.warning(f"Modo Edição: Aula de {rel_data['data']}")
+                            new_tm = st.text_input("Tema/Disciplina", value=rel_data['disciplina_tema'])
+                            new_pl = st.text_area("Atividades Planejadas", value=rel_data['planejado'])
+                            new_re = st.text_area("Atividades Realizadas", value=rel_data['realizado'])
+                            new_pa = st.radio("Participou?", ["Sim", "Não"], index=0 if rel_data['participou_aula'] == "Sim" else 1)
+                            new_pn = st.multiselect("Nível:", ["REALIZOU COM AUTONOMIA", "APOIO ADULTO", "APOIO COLEGA", "NÃO REALIZOU"], default=str(rel_data['participacao']).split(", "))
+                            new_ft = st.file_uploader("Substituir foto (opcional)", type=['png', 'jpg', 'jpeg'])
                         
-                        b1, b2 = st.columns(2)
-                        if b1.form_submit_button("💾 Salvar Alterações"):
-                            p_f_update = rel_data['foto_path']
-                            if new_ft:
-                                p_f_update = f"aula_{datetime.now().strftime('%Y%m%d%H%M%S')}.png"
-                                supabase.storage.from_("fotos_aee").upload(p_f_update, new_ft.getvalue())
+                            b1, b2 = st.columns(2)
+                            if b1.form_submit_button("💾 Salvar Alterações"):
+                                p_f_update = rel_data['foto_path']
+                                try:
+                                    if new_ft:
+                                        p_f_update, economia = enviar_foto("fotos_aee", f"aula_{datetime.now().strftime('%Y%m%d%H%M%S')}", new_ft, LARGURA_FOTO_AULA)
+                                        st.toast(economia)
+                                except FotoInvalida as e:
+                                    st.error(str(e))
+                                else:
+                                    repo.atualizar_relatorio(rel_data['id'], {
+                                        "disciplina_tema": new_tm, "planejado": new_pl, "realizado": new_re,
+                                        "participou_aula": new_pa, "participacao": ", ".join(new_pn), "foto_path": p_f_update
+                                    })
+                                    cache_rels.marcar_sujo(); registrar_evento("relatorio_editado", rel_data['id']); st.session_state.pop("rel_aberto", None)
+                                    if new_ft and rel_data['foto_path'] and rel_data['foto_path'] != p_f_update:  # a foto substituída não fica órfã no Storage
+                                        try: repo.remover_fotos("fotos_aee", [rel_data['foto_path']])
+                                        except: pass
+                                        cache_fotos.invalidar("fotos_aee", rel_data['foto_path'])
+                                    st.toast("✅ Registro atualizado!"); time.sleep(1); st.rerun()
                             
-                            supabase.table("relatorios").update({
-                                "disciplina_tema": new_tm, "planejado": new_pl, "realizado": new_re,
-                                "participou_aula": new_pa, "participacao": ", ".join(new_pn), "foto_path": p_f_update
-                            }).eq("id", rel_data['id']).execute()
-                            st.toast("✅ Registro atualizado!"); time.sleep(1); st.rerun()
-                            
-                        if b2.form_submit_button("❌ EXCLUIR DEFINITIVAMENTE"):
-                            if rel_data['foto_path']:
-                                try: supabase.storage.from_("fotos_aee").remove([rel_data['foto_path']])
-                                except: pass
-                            supabase.table("relatorios").delete().eq("id", rel_data['id']).execute()
-                            st.toast("⚠️ Registro removido!"); time.sleep(1); st.rerun()
+                            if b2.form_submit_button("❌ EXCLUIR DEFINITIVAMENTE"):
+                                if rel_data['foto_path']:
+                                    try: repo.remover_fotos("fotos_aee", [rel_data['foto_path']])
+                                    except: pass
+                                    cache_fotos.invalidar("fotos_aee", rel_data['foto_path'])
+                                repo.excluir_relatorio(rel_data['id'])
+                                cache_rels.marcar_sujo(); registrar_evento("relatorio_excluido", rel_data['id']); st.session_state.pop("rel_aberto", None)
+                                st.toast("⚠️ Registro removido!"); time.sleep(1); st.rerun()
 
         # --- ABAS DE GESTÃO (SÓ APARECEM PARA SUPER_PERFIS) ---
         if st.session_state.u_perfil in super_perfis:
             with abas[2]: # GESTÃO DE ALUNOS
                 st.subheader("Gestão de Alunos")
+                if st.session_state.u_perfil in ["gestao", "gestor"]:
+                    with st.expander("📥 Importar planilha de estudantes (cadastro_AEE.xlsx)"):
+                        arq_imp = st.file_uploader("Planilha .xlsx (em branco, usa o cadastro_AEE.xlsx do servidor)", type=["xlsx"], key="arq_imp")
+                        subst_fotos = st.checkbox("Substituir fotos já cadastradas", key="subst_fotos_imp")
+                        if st.button("🔍 Analisar planilha"):
+                            try:
+                                df_ok, probs = normalizar_cadastro(ler_planilha(arq_imp or "cadastro_AEE.xlsx"))
+                                st.session_state.imp = (df_ok, probs, *comparar(df_ok, df_alunos))
+                            except Exception as e:
+                                st.error(f"Não foi possível ler a planilha: {e}")
+                        if "imp" in st.session_state:
+                            df_ok, probs, novos, alterados, inalterados = st.session_state.imp
+                            m1, m2, m3, m4 = st.columns(4)
+                            m1.metric("Novos", len(novos)); m2.metric("Alterados", len(alterados))
+                            m3.metric("Sem mudança", len(inalterados)); m4.metric("Com problema", len(probs))
+                            if not probs.empty:
+                                st.warning("Linhas com problema (as marcadas como descartadas não serão importadas):")
+                                st.dataframe(probs, hide_index=True, width="stretch")
+                            if not novos.empty:
+                                st.markdown("**Novos estudantes**"); st.dataframe(novos[COLUNAS_IMPORTACAO], hide_index=True, width="stretch")
+                            if not alterados.empty:
+                                st.markdown("**Cadastros que serão atualizados**"); st.dataframe(alterados[COLUNAS_IMPORTACAO], hide_index=True, width="stretch")
+                            if st.button("✅ Confirmar importação"):
+                                barra = st.progress(0.0, text="Enviando fotos de fotos_alunos/...")
+                                res = importar(repo, novos, alterados, inalterados, "fotos_alunos", normalizar_imagem, LARGURA_FOTO_PERFIL, subst_fotos,
+                                               lambda f, t: barra.progress(f / t, text=f"Gravando estudantes... {f}/{t}"))
+                                for c in res["fotos"]: cache_fotos.invalidar("fotos_perfil", c)
+                                cache_tabelas.invalidar("estudantes")
+                                del st.session_state.imp
+                                st.session_state.avisos = [f"✅ {res['gravados']} estudantes gravados, {len(res['fotos'])} fotos enviadas."]
+                                st.session_state.avisos += [f"⚠️ Foto não enviada - {e}" for e in res["falhas_fotos"]]
+                                st.rerun()
                 if "al_form_id" not in st.session_state: st.session_state.al_form_id = 0
                 modo_a = st.radio("Ação Estudante:", ["Novo", "Editar/Excluir"], horizontal=True, key=f"ma_{st.session_state.al_form_id}")
                 al_edit = None
                 if modo_a == "Editar/Excluir" and not df_alunos.empty:
-                    df_alunos['ex_g'] = df_alunos['aluno'] + " - " + df_alunos['turma']
-                    sel_a_g = st.selectbox("Escolha:", sorted(df_alunos['ex_g'].tolist()), key=f"sag_{st.session_state.al_form_id}")
-                    al_edit = df_alunos[df_alunos['aluno'] == sel_a_g.split(" - ")[0]].iloc[0]
+                    reg_g = st.selectbox("Escolha:", cad.registros, format_func=cad.rotulo, key=f"sag_{st.session_state.al_form_id}")
+                    al_edit = cad.aluno(reg_g)
                 with st.form(key=f"f_al_{st.session_state.al_form_id}"):
                     reg = st.text_input("Registro", value=al_edit['registro'] if al_edit is not None else "")
                     nom = st.text_input("Nome", value=al_edit['aluno'] if al_edit is not None else "")
@@ -440,18 +845,31 @@ else:
                     nec = st.text_area("Condição", value=al_edit['necessidades'] if al_edit is not None else "")
                     nas = st.text_input("Nascimento", value=al_edit['data_nascimento'] if al_edit is not None else "")
                     obs = st.text_area("Observações", value=al_edit['observacoes_gerais'] if al_edit is not None else "")
-                    ft_p = st.file_uploader("Foto Perfil")
+                    ft_p = st.file_uploader("Foto Perfil", type=['png', 'jpg', 'jpeg'])
                     c1, c2 = st.columns(2)
                     if c1.form_submit_button("Salvar Perfil"):
                         p_path = al_edit['foto_path'] if al_edit is not None else ""
-                        if ft_p:
-                            p_path = f"perfil_{reg}.png"
-                            supabase.storage.from_("fotos_perfil").upload(p_path, ft_p.getvalue(), {"upsert": "true"})
-                        supabase.table("estudantes").upsert({"registro": reg, "aluno": nom, "turma": tur, "necessidades": nec, "data_nascimento": nas, "observacoes_gerais": obs, "foto_path": p_path}).execute()
-                        st.toast("✅ Aluno salvo!"); st.session_state.al_form_id += 1; time.sleep(1); st.rerun()
+                        try:
+                            if ft_p:
+                                p_path, economia = enviar_foto("fotos_perfil", f"perfil_{reg}", ft_p, LARGURA_FOTO_PERFIL, upsert=True)
+                                cache_fotos.invalidar("fotos_perfil", p_path)
+                                st.toast(economia)
+                        except FotoInvalida as e:
+                            st.error(str(e))
+                        else:
+                            repo.salvar_estudantes([{"registro": reg, "aluno": nom, "turma": tur, "necessidades": nec, "data_nascimento": nas, "observacoes_gerais": obs, "foto_path": p_path}])
+                            if ft_p and al_edit is not None and al_edit['foto_path'] and al_edit['foto_path'] != p_path:
+                                try: repo.remover_fotos("fotos_perfil", [al_edit['foto_path']])
+                                except: pass
+                                cache_fotos.invalidar("fotos_perfil", al_edit['foto_path'])
+                            cache_tabelas.invalidar("estudantes")
+                            st.toast("✅ Aluno salvo!"); st.session_state.al_form_id += 1; time.sleep(1); st.rerun()
                     if modo_a == "Editar/Excluir" and c2.form_submit_button("❌ EXCLUIR ALUNO"):
-                        if al_edit['foto_path']: supabase.storage.from_("fotos_perfil").remove([al_edit['foto_path']])
-                        supabase.table("estudantes").delete().eq("registro", al_edit['registro']).execute()
+                        if al_edit['foto_path']:
+                            repo.remover_fotos("fotos_perfil", [al_edit['foto_path']])
+                            cache_fotos.invalidar("fotos_perfil", al_edit['foto_path'])
+                        repo.excluir_estudante(al_edit['registro'])
+                        cache_tabelas.invalidar("estudantes")
                         st.session_state.al_form_id += 1; time.sleep(1); st.rerun()
 
             with abas[3]: # GESTÃO DE PROFESSORES
@@ -464,39 +882,153 @@ else:
                     with st.form(key=f"fn_{st.session_state.p_form_id}"):
                         nr, nn = st.text_input("RF"), st.text_input("Nome"); np = st.selectbox("Perfil", perfis_op)
                         if st.form_submit_button("Cadastrar"):
-                            if not df_prof[df_prof['rf'] == nr].empty: st.error("RF já existe!"); st.stop()
-                            supabase.table("professores").insert({"rf": nr, "nome": nn, "perfil": np}).execute()
+                            if cad.professor(nr) is not None: st.error("RF já existe!"); st.stop()
+                            repo.inserir_professor({"rf": nr, "nome": nn, "perfil": np})
+                            cache_tabelas.invalidar("professores")
                             st.toast("✅ Cadastrado!"); st.session_state.p_form_id += 1; time.sleep(1); st.rerun()
                 else:
-                    l_edit = sorted(df_prof['nome'].tolist()) if st.session_state.u_perfil == "gestao" else sorted(df_prof[df_prof['perfil'] != 'gestao']['nome'].tolist())
-                    psn = st.selectbox("Selecionar:", l_edit)
-                    psd = df_prof[df_prof['nome'] == psn].iloc[0]
-                    with st.form(f"fe_{psn}"):
+                    psr = st.selectbox("Selecionar:", cad.rfs_visiveis(st.session_state.u_perfil), format_func=cad.nome_professor)
+                    psd = cad.professor(psr)
+                    with st.form(f"fe_{psr}"):
                         en, ep = st.text_input("Nome", value=psd['nome']), st.selectbox("Perfil", perfis_op, index=perfis_op.index(psd['perfil']) if psd['perfil'] in perfis_op else 0)
                         c_b1, c_b2 = st.columns(2)
-                        if c_b1.form_submit_button("Atualizar"): supabase.table("professores").update({"nome": en, "perfil": ep}).eq("rf", psd['rf']).execute(); st.rerun()
+                        if c_b1.form_submit_button("Atualizar"):
+                            repo.atualizar_professor(psd['rf'], {"nome": en, "perfil": ep})
+                            cache_tabelas.invalidar("professores"); st.rerun()
                         if c_b2.form_submit_button("Excluir"):
-                            supabase.table("professores").delete().eq("rf", psd['rf']).execute()
-                            supabase.table("credenciais").delete().eq("rf", psd['rf']).execute(); st.rerun()
+                            repo.excluir_professor(psd['rf'])
+                            repo.excluir_credencial(psd['rf'])
+                            cache_tabelas.invalidar("professores"); st.rerun()
 
             with abas[4]: # SEGURANÇA E RESET
                 st.subheader("Segurança e Monitoramento")
                 col1, col2 = st.columns(2)
                 with col1:
-                    pr = st.selectbox("Resetar Professor:", sorted(df_prof[df_prof['perfil'] != 'gestao']['nome'].tolist()) if st.session_state.u_perfil != "gestao" else sorted(df_prof['nome'].tolist()))
-                    if st.button("Resetar Senha"): supabase.table("credenciais").delete().eq("rf", df_prof[df_prof['nome'] == pr].iloc[0]['rf']).execute(); st.warning("Resetado.")
+                    pr = st.selectbox("Resetar Professor:", cad.rfs_visiveis(st.session_state.u_perfil), format_func=cad.nome_professor)
+                    if st.button("Resetar Senha") and pr is not None: repo.excluir_credencial(pr); st.warning("Resetado.")
+                    st.caption(f"Cache de cadastros: {cache_tabelas.hits} acertos / {cache_tabelas.misses} buscas ao Supabase")
+                    st.caption(f"Cache de relatórios: {len(cache_rels.linhas)} em memória | {cache_rels.sincronias} sincronizações, {cache_rels.linhas_recebidas} linhas recebidas")
                     if st.button("📊 Monitoramento Excel"):
-                        all_r = pd.DataFrame(supabase.table("relatorios").select("*").execute().data)
-                        if not all_r.empty:
-                            m = all_r.merge(df_prof[['rf', 'nome']], left_on='rf_professor', right_on='rf', how='left').merge(df_alunos[['registro', 'aluno', 'turma']], left_on='registro_aluno', right_on='registro', how='left')
-                            m = m[['nome_y', 'aluno', 'turma', 'data', 'bimestre']]; m.columns = ['Professor', 'Aluno', 'Turma', 'Data', 'Bimestre']
-                            out = BytesIO(); m.to_excel(out, index=False); st.download_button("Download Excel", out.getvalue(), "monitor.xlsx")
+                        with st.spinner("Montando planilha..."):
+                            caminho_xlsx, total_r = exportar_monitoramento(repo, df_prof, df_alunos)
+                        with open(caminho_xlsx, "rb") as f_xlsx: dados_xlsx = f_xlsx.read()
+                        os.remove(caminho_xlsx)
+                        if total_r:
+                            st.download_button(f"Download Excel ({total_r} relatórios)", dados_xlsx, "monitor.xlsx", on_click=registrar_evento, args=("download", "monitor.xlsx"))
+                    if st.session_state.u_perfil in ["gestao", "gestor"]:
+                        with st.expander("🧹 Fotos órfãs no Storage"):
+                            st.caption(f"Compara os buckets com as fotos citadas nos relatórios e no cadastro de alunos. Arquivos com menos de {CARENCIA_COLETA // 3600}h são sempre preservados.")
+                            simular = st.checkbox("Somente simular (não apaga nada)", value=True, key="simular_coleta")
+                            if st.button("🧹 Executar coleta"):
+                                status_c = st.empty()
+                                orfaos = levantar_orfaos(repo, progresso=lambda b, v, o: status_c.caption(f"Listando {b}: {v} arquivos, {o} órfãos..."))
+                                status_c.empty()
+                                st.dataframe(pd.DataFrame([{"Bucket": b, "Órfãos": len(v), "Tamanho": fmt_bytes(sum(f['bytes'] for f in v))}
+                                                           for b, v in orfaos.items()]), hide_index=True, width="stretch")
+                                if not simular and any(orfaos.values()):
+                                    barra_c = st.progress(0.0, text="Removendo...")
+                                    feitos_c, liberados_c, falhas_c = remover_orfaos(repo, orfaos, progresso=lambda f, t: barra_c.progress(f / t, text=f"Removendo... {f}/{t}"))
+                                    for b, v in orfaos.items():
+                                        for f in v: cache_fotos.invalidar(b, f['nome'])
+                                    st.success(f"{feitos_c} arquivo(s) removido(s), {fmt_bytes(liberados_c)} liberados.")
+                                    for f in falhas_c: st.error(f)
+                        with st.expander("📈 Atividade por professor (semanal)"):
+                            semanas_a = st.slider("Semanas:", 4, 26, 8, key="semanas_atividade")
+                            hoje_a = datetime.now().date()
+                            desde_a = (hoje_a - timedelta(days=hoje_a.weekday() + 7 * (semanas_a - 1))).isoformat()
+                            try:
+                                df_atv = resumo_atividade(desde_a)
+                            except Exception as e:
+                                df_atv = pd.DataFrame(); st.error(f"Não foi possível ler os logs: {e}")
+                            acoes_a = {"Logins": "login", "Relatórios lançados": "relatorio_lancado", "Edições": "relatorio_editado",
+                                       "Exclusões": "relatorio_excluido", "Downloads": "download"}
+                            met_a = st.selectbox("Métrica:", list(acoes_a), key="metrica_atividade")
+                            df_m = df_atv[df_atv['acao'] == acoes_a[met_a]].copy() if not df_atv.empty else df_atv
+                            if df_m.empty:
+                                st.info("Nenhum evento registrado no período.")
+                            else:
+                                df_m['Professor'] = df_m['rf'].map(cad.nome_professor)
+                                tab_a = df_m.pivot_table(index='Professor', columns='semana', values='total', aggfunc='sum', fill_value=0)
+                                tab_a.columns = [datetime.strptime(str(c)[:10], '%Y-%m-%d').strftime('%d/%m') for c in tab_a.columns]
+                                tab_a['Total'] = tab_a.sum(axis=1)
+                                st.dataframe(tab_a.sort_values('Total', ascending=False), width="stretch")
+                            st.caption(f"Registro de eventos: {registro_eventos.gravados} gravados neste servidor, {len(registro_eventos.buffer)} aguardando envio.")
                 with col2:
                     if st.session_state.u_perfil == "gestao":
                         st.error("🚨 RESET TOTAL")
                         if st.button("🚨 ZERAR TUDO"): st.session_state.conf_res = True
                         if st.session_state.get("conf_res") and st.button("CONFIRMAR APAGAMENTO"):
-                            for t in ["relatorios", "logs", "credenciais", "estudantes", "professores"]:
-                                col_pk = "id" if t in ["relatorios", "logs"] else ("rf" if t in ["professores", "credenciais"] else "registro")
-                                supabase.table(t).delete().neq(col_pk, "xxx").execute()
-                            st.session_state.logged_in = False; st.rerun()
\ No newline at end of file
+                            repo.limpar_tudo()
+                            cache_tabelas.invalidar("estudantes", "professores"); cache_rels.marcar_sujo()
+                            st.session_state.logged_in = False; st.rerun()
+
+            if medidor:
+                with abas[5]: # DESEMPENHO (só com a instrumentação ligada)
+                    st.subheader("Desempenho por Rerun")
+                    st.caption(f"Últimos {len(medidor.reruns)} reruns, de todas as sessões. Os que terminam em st.rerun()/st.stop() contam até a última operação medida.")
+                    st.markdown("**Latência por página**")
+                    st.dataframe(pd.DataFrame(medidor.resumo_paginas()), hide_index=True, width="stretch")
+                    st.markdown("**Operações mais lentas** (tabelas, Storage, DOCX/Excel)")
+                    st.dataframe(pd.DataFrame(medidor.resumo_operacoes()), hide_index=True, width="stretch")
+
+            with abas[-2]: # BUSCA NOS RELATÓRIOS (índice FTS5 em memória, atualizado pelo cache de relatórios)
+                st.subheader("Buscar nos Relatórios")
+                st.caption('Procura no tema, nas atividades planejadas e realizadas e no motivo de não participação. Acentos são ignorados; use "aspas" para frase exata.')
+                termo_b = st.text_input("Buscar por:", key="termo_busca", placeholder="ex.: comunicação alternativa")
+                cb1, cb2, cb3 = st.columns(3)
+                turma_b = cb1.selectbox("Turma:", ["Todas"] + cad.turmas, key="turma_busca")
+                bim_b = cb2.selectbox("Bimestre:", ["Todos"] + BIMESTRES, key="bim_busca")
+                prof_b = cb3.selectbox("Professor:", [None] + cad.rfs, format_func=lambda rf: "Todos" if rf is None else cad.nome_professor(rf), key="prof_busca")
+                if st.session_state.get("filtros_busca") != (termo_b, turma_b, bim_b, prof_b):
+                    st.session_state.filtros_busca, st.session_state.pag_busca = (termo_b, turma_b, bim_b, prof_b), 0
+                if termo_b.strip():
+                    indice = obter_indice_busca()
+                    cache_rels.sincronizar()
+                    t_busca = time.perf_counter()
+                    total_b, achados = indice.buscar(termo_b,
+                        registros=cad.por_turma.get(turma_b, []) if turma_b != "Todas" else None,
+                        rf_professor=prof_b, bimestre=bim_b if bim_b != "Todos" else None, pagina=st.session_state.pag_busca)
+                    t_busca = (time.perf_counter() - t_busca) * 1000
+                    st.caption(f"{total_b} relatório(s) encontrado(s) em {t_busca:.0f} ms, entre {indice.total} indexados.")
+                    for a in achados:
+                        st.markdown(f"**{cad.rotulo(a['registro_aluno'])}** · {a['data']} · {a['bimestre']} · "
+                                    f"{cad.nome_professor(a['rf_professor'])}  \n" + (f"*{a['disciplina_tema']}* — " if a['disciplina_tema'] else "") + a['trecho'])
+                    paginas_b = -(-total_b // POR_PAGINA_BUSCA)
+                    if paginas_b > 1:
+                        pb1, pb2, pb3 = st.columns([1, 2, 1])
+                        if pb1.button("◀ Anteriores", disabled=st.session_state.pag_busca == 0):
+                            st.session_state.pag_busca -= 1; st.rerun()
+                        pb2.caption(f"Página {st.session_state.pag_busca + 1} de {paginas_b}")
+                        if pb3.button("Próximos ▶", disabled=st.session_state.pag_busca >= paginas_b - 1):
+                            st.session_state.pag_busca += 1; st.rerun()
+
+            with abas[-1]: # EXPORTAÇÃO EM LOTE
+                st.subheader("Exportar Documentos da Turma")
+                if df_alunos.empty:
+                    st.info("Nenhum aluno cadastrado no sistema.")
+                else:
+                    cl1, cl2 = st.columns(2)
+                    turma_lote = cl1.selectbox("Turma:", ["Todas"] + cad.turmas, key="turma_lote")
+                    bim_lote = cl2.selectbox("Bimestre:", ["Todos", "1º Bimestre", "2º Bimestre", "3º Bimestre", "4º Bimestre"], key="bim_lote")
+                    df_lote = df_alunos if turma_lote == "Todas" else df_alunos[df_alunos['turma'] == turma_lote]
+                    st.caption(f"{len(df_lote)} estudante(s) selecionado(s).")
+                    if st.button("📦 Gerar ZIP"):
+                        varrer_zips_lote()
+                        barra = st.progress(0.0, text="Buscando relatórios...")
+                        df_rels_lote = pd.DataFrame(repo.listar_relatorios(
+                            registros=cad.por_turma[turma_lote] if turma_lote != "Todas" else None,
+                            bimestre=bim_lote if bim_lote != "Todos" else None))
+                        caminho_zip = exportar_lote_zip(df_lote, df_rels_lote, bim_lote, cad.nomes_professores,
+                                                        lambda f, t: barra.progress(f / t, text=f"Gerando documentos... {f}/{t}"))
+                        antigo = st.session_state.get("zip_lote")
+                        if antigo and os.path.exists(antigo[0]): os.remove(antigo[0])
+                        st.session_state.zip_lote = (caminho_zip, f"Documentos_{_nome_arquivo(turma_lote)}_{_nome_arquivo(bim_lote)}.zip")
+                    if st.session_state.get("zip_lote") and not os.path.exists(st.session_state.zip_lote[0]):
+                        st.session_state.pop("zip_lote")  # já baixado ou varrido
+                    if st.session_state.get("zip_lote"):
+                        caminho_zip, nome_zip = st.session_state.zip_lote
+                        st.download_button("📥 Baixar ZIP", ler_zip_lote(caminho_zip, nome_zip, st.session_state.u_rf), nome_zip,
+                                           mime="application/zip", on_click="ignore")
+                        st.caption("O arquivo sai do servidor depois do download.")
+
+if medidor: medidor.finalizar_rerun(st.session_state.pop("rerun_medido", None))
@@ -0,0 +1,300 @@
+"""Benchmarks do AEE Conecta, rodando sobre o backend local (repositorio.RepositorioLocal), sem rede.
+
+Para cada escala de `relatorios` (100, 1k, 10k, 100k por padrão), com e sem fotos, o script:
+  * semeia professores, estudantes e relatórios sintéticos num SQLite temporário;
+  * mede rerun frio (caches do app limpos) e quente de cada página/aba, via streamlit.testing.AppTest;
+  * mede gerar_folha_rosto, gerar_relatorio_aula por quantidade de relatórios e o Monitoramento Excel;
+  * mede a inicialização a frio (processo novo até a tela de login) e quais bibliotecas pesadas ela carregou.
+Cada medição registra tempo de parede, pico de memória (tracemalloc) e número de chamadas ao backend,
+e o resultado vai para um JSON que pode ser comparado entre commits.
+
+Uso:
+    python benchmarks/bench_aee.py
+    python benchmarks/bench_aee.py --escalas 100,1000 --sem-app --saida /tmp/base.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import date, datetime, timedelta
+from io import BytesIO
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import pandas as pd
+from PIL import Image, ImageDraw
+
+from repositorio import RepositorioLocal
+from cadastro import Cadastro
+from documentos import gerar_folha_rosto, gerar_relatorio_aula, exportar_monitoramento, BIMESTRES
+
+APP = os.path.join(RAIZ, "AEE Conecta.py")
+ESCALAS = [100, 1_000, 10_000, 100_000]
+QTDS_RELATORIO_AULA = [1, 10, 50, 200]
+NUM_PROFESSORES = 40
+TURMAS = [f"{a}{t}" for a in range(1, 10) for t in "ABC"]
+NUM_FOTOS_DISTINTAS = 40  # as fotos sintéticas se repetem entre registros para não encher o disco
+NIVEIS = ["REALIZOU COM AUTONOMIA", "APOIO ADULTO", "APOIO COLEGA", "NÃO REALIZOU"]
+PALAVRAS = ("atividade leitura escrita jogo pareamento comunicação alternativa pranchas rotina visual coordenação "
+            "motora fina recorte colagem contagem material concreto mediação autonomia atenção interação colega").split()
+
+# --- contagem de chamadas ao backend ---
+# Os métodos públicos do RepositorioLocal são embrulhados na própria classe, então as chamadas feitas
+# pelo app dentro do AppTest (mesmo processo) também entram na conta.
+chamadas = Counter()
+
+def _instrumentar_repositorio():
+    for nome in dir(RepositorioLocal):
+        if nome.startswith("_") or nome.startswith("semear"): continue
+        original = getattr(RepositorioLocal, nome)
+        if not callable(original): continue
+        def contado(self, *args, _nome=nome, _orig=original, **kwargs):
+            chamadas[_nome] += 1
+            return _orig(self, *args, **kwargs)
+        setattr(RepositorioLocal, nome, contado)
+
+def medir(fn):
+    """Executa fn() e devolve (resultado, {tempo_s, pico_mem_mb, chamadas})."""
+    gc.collect()
+    antes = sum(chamadas.values())
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    res = fn()
+    dt = time.perf_counter() - t0
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return res, {"tempo_s": round(dt, 4), "pico_mem_mb": round(pico / 2**20, 2), "chamadas": sum(chamadas.values()) - antes}
+
+# --- dados sintéticos ---
+def _foto_sintetica(i, largura=1050, altura=788):
+    rnd = random.Random(i)
+    img = Image.new("RGB", (largura, altura), tuple(rnd.randrange(256) for _ in range(3)))
+    d = ImageDraw.Draw(img)
+    for _ in range(60):
+        x, y = rnd.randrange(largura), rnd.randrange(altura)
+        d.ellipse((x, y, x + rnd.randrange(20, 200), y + rnd.randrange(20, 200)), fill=tuple(rnd.randrange(256) for _ in range(3)))
+    buf = BytesIO(); img.save(buf, "JPEG", quality=82); return buf.getvalue()
+
+def _texto(rnd, n):
+    return " ".join(rnd.choice(PALAVRAS) for _ in range(n)).capitalize() + "."
+
+def semear_sintetico(repo, num_relatorios, com_fotos, semente=42):
+    rnd = random.Random(semente)
+    fotos_aula, fotos_perfil = [], []
+    if com_fotos:
+        for i in range(NUM_FOTOS_DISTINTAS):
+            dados = _foto_sintetica(i)
+            repo.gravar_foto("fotos_aee", f"aula_sint_{i}.jpg", dados, "image/jpeg", upsert=True); fotos_aula.append(f"aula_sint_{i}.jpg")
+            repo.gravar_foto("fotos_perfil", f"perfil_sint_{i}.jpg", dados, "image/jpeg", upsert=True); fotos_perfil.append(f"perfil_sint_{i}.jpg")
+
+    professores = [{"rf": str(1000 + i), "nome": f"Professor {i:02d}", "perfil": "gestao" if i == 0 else rnd.choice(["professor", "professor", "paee"])}
+                   for i in range(NUM_PROFESSORES)]
+    for p in professores: repo.inserir_professor(p)
+    num_alunos = min(2_500, max(50, num_relatorios // 40))
+    alunos = [{"registro": str(2_000_000 + i), "aluno": f"Estudante {i:05d}", "turma": TURMAS[i % len(TURMAS)],
+               "necessidades": rnd.choice(["TEA", "TDAH", "Baixa visão", "Deficiência intelectual leve"]), "data_nascimento": "01/01/2015",
+               "observacoes_gerais": _texto(rnd, 40), "foto_path": rnd.choice(fotos_perfil) if fotos_perfil else ""}
+              for i in range(num_alunos)]
+    repo.salvar_estudantes(alunos)
+
+    inicio = date(datetime.now().year, 2, 1)
+    lote = []
+    for i in range(num_relatorios):
+        dia = inicio + timedelta(days=rnd.randrange(300))
+        participou = "Sim" if rnd.random() < 0.85 else "Não"
+        lote.append({
+            "chave_envio": f"sint-{i}", "data": dia.strftime('%d/%m/%Y'), "rf_professor": rnd.choice(professores)['rf'],
+            "registro_aluno": rnd.choice(alunos)['registro'], "bimestre": BIMESTRES[min(3, (dia.month - 2) // 3)],
+            "participou_aula": participou, "motivo_nao_participou": _texto(rnd, 12) if participou == "Não" else "",
+            "disciplina_tema": _texto(rnd, 4), "planejado": _texto(rnd, 80), "realizado": _texto(rnd, 60) if participou == "Sim" else "",
+            "participacao": ", ".join(rnd.sample(NIVEIS, rnd.randint(1, 2))) if participou == "Sim" else "",
+            "foto_path": rnd.choice(fotos_aula) if fotos_aula and rnd.random() < 0.7 else ""})
+        if len(lote) == 5_000:
+            repo.gravar_relatorios(lote); lote = []
+    repo.gravar_relatorios(lote)
+    return professores, alunos
+
+# --- reruns das páginas (AppTest) ---
+def _limpar_caches_app(pasta_cache_fotos):
+    import streamlit as st
+    st.cache_resource.clear(); st.cache_data.clear()
+    shutil.rmtree(pasta_cache_fotos, ignore_errors=True)
+
+def medir_paginas(aluno_doc, aluno_lanc, pasta_cache_fotos, timeout):
+    """Rerun frio (caches limpos) e quente de cada página, logado como gestão."""
+    from streamlit.testing.v1 import AppTest
+
+    def nova_sessao(logado=True):
+        at = AppTest.from_file(APP, default_timeout=timeout)
+        if logado:
+            at.session_state["logged_in"] = True
+            at.session_state["u_rf"], at.session_state["u_nome"], at.session_state["u_perfil"] = "1000", "Professor 00", "gestao"
+        return at
+
+    def ir_para(pagina):
+        return lambda at: at.sidebar.radio[0].set_value(pagina)
+
+    def na_pagina(pagina, acao):
+        def preparar(at):
+            at.sidebar.radio[0].set_value(pagina).run()
+            acao(at)
+        return preparar
+
+    # (nome, logado, preparação antes da rodada medida)
+    cenarios = [
+        ("Login", False, lambda at: None),
+        ("Início", True, lambda at: None),
+        ("Lançar Relatório", True, ir_para("Lançar Relatório")),
+        ("Lançar Relatório › aluno selecionado", True, na_pagina("Lançar Relatório", lambda at: at.selectbox(key="al_sel_0").set_value(aluno_lanc))),
+        ("Painel de Documentos", True, ir_para("Painel de Documentos")),
+        ("Painel › Documentos (troca de aluno)", True, na_pagina("Painel de Documentos", lambda at: at.selectbox(key="sel_doc_imp").set_value(aluno_doc))),
+        ("Painel › Alterar ou Excluir", True, na_pagina("Painel de Documentos", lambda at: at.selectbox(key="sel_edit_rel").set_value(aluno_doc))),
+        ("Painel › Gestão de Alunos (editar)", True, na_pagina("Painel de Documentos", lambda at: at.radio(key="ma_0").set_value("Editar/Excluir"))),
+    ]
+    resultados = []
+    for nome, logado, preparar in cenarios:
+        at = nova_sessao(logado)
+        at.run()
+        preparar(at)
+        _limpar_caches_app(pasta_cache_fotos)
+        _, frio = medir(at.run)
+        _, quente = medir(at.run)
+        erros = [e.value for e in at.exception]
+        resultados.append({"etapa": f"rerun: {nome}", "frio": frio, "quente": quente, "erros": erros})
+    return resultados
+
+# --- inicialização a frio ---
+# Cada medição roda num processo Python novo: importa o Streamlit, executa o script até a tela de login e
+# informa quais bibliotecas pesadas foram carregadas (o login não deveria precisar de docx/PIL/openpyxl).
+# Cada import é atribuído ao arquivo que o pediu: "modulos_pesados" conta só os pedidos pelo código do app;
+# os que o próprio Streamlit carrega (o PIL do page_icon="logo.png" no set_page_config) vão à parte, em
+# "modulos_pesados_streamlit", porque não dependem do app e não somem adiando imports.
+CODIGO_INICIALIZACAO = """
+import json, os, sys, time
+PESADOS, RAIZ, origens = ("docx", "PIL", "openpyxl", "supabase"), os.path.dirname(os.path.abspath(sys.argv[1])), {}
+class Origem:
+    def find_spec(self, nome, caminho=None, alvo=None):
+        if nome in PESADOS and nome not in origens:
+            f = sys._getframe(1)
+            while f and (f.f_code.co_filename.startswith("<frozen") or "importlib" in f.f_code.co_filename): f = f.f_back
+            origens[nome] = os.path.abspath(f.f_code.co_filename) if f else ""
+sys.meta_path.insert(0, Origem())
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+t2 = time.perf_counter()
+print(json.dumps({"import_streamlit_s": round(t1 - t0, 4), "login_s": round(t2 - t1, 4),
+                  "modulos_pesados": [m for m in PESADOS if m in sys.modules and origens.get(m, "").startswith(RAIZ)],
+                  "modulos_pesados_streamlit": [m for m in PESADOS if m in sys.modules and not origens.get(m, "").startswith(RAIZ)],
+                  "erros": [e.value for e in at.exception]}))
+"""
+
+def medir_inicializacao(ambiente, repeticoes):
+    res = []
+    for i in range(repeticoes):
+        t0 = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", CODIGO_INICIALIZACAO, APP], cwd=RAIZ, env=ambiente, capture_output=True, text=True, check=True).stdout
+        res.append({"etapa": "inicializacao: login", "execucao": i + 1, "processo_s": round(time.perf_counter() - t0, 4), **json.loads(out.strip().splitlines()[-1])})
+    return res
+
+# --- construtores de documentos ---
+def medir_documentos(repo, df_prof, df_est, aluno):
+    res = []
+    nomes_prof = Cadastro(df_est, df_prof).nomes_professores
+    _, m = medir(lambda: gerar_folha_rosto(aluno, repo.baixar_foto))
+    res.append({"etapa": "gerar_folha_rosto", **m})
+    pagina = next(repo.iterar_relatorios("*", tamanho=max(QTDS_RELATORIO_AULA)), [])
+    for n in QTDS_RELATORIO_AULA:
+        if n > len(pagina): break
+        tempos = {}
+        _, m = medir(lambda: gerar_relatorio_aula(pd.DataFrame(pagina[:n]), aluno['aluno'], aluno['turma'], nomes_prof, repo.baixar_foto, tempos))
+        res.append({"etapa": "gerar_relatorio_aula", "relatorios": n, **m,
+                    "busca_fotos_s": round(tempos.get("busca_fotos", 0), 4), "montagem_s": round(tempos.get("montagem", 0), 4)})
+    (caminho, total), m = medir(lambda: exportar_monitoramento(repo, df_prof, df_est))
+    res.append({"etapa": "monitoramento_excel", "relatorios": total, "tamanho_xlsx": os.path.getsize(caminho), **m})
+    os.remove(caminho)
+    return res
+
+def _commit_atual():
+    try: return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, text=True).strip()
+    except Exception: return "desconhecido"
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--escalas", default=",".join(map(str, ESCALAS)), help="quantidades de relatórios, separadas por vírgula")
+    ap.add_argument("--fotos", choices=["ambos", "com", "sem"], default="ambos")
+    ap.add_argument("--sem-app", action="store_true", help="não mede os reruns das páginas (AppTest)")
+    ap.add_argument("--inicializacao", type=int, default=3, metavar="N", help="repetições da medição de inicialização a frio (0 desliga)")
+    ap.add_argument("--timeout", type=float, default=600, help="limite em segundos por rerun no AppTest")
+    ap.add_argument("--saida", help="arquivo JSON de saída (padrão: benchmarks/resultados/<commit>_<data>.json)")
+    args = ap.parse_args()
+
+    _instrumentar_repositorio()
+    commit = _commit_atual()
+    saida = args.saida or os.path.join(RAIZ, "benchmarks", "resultados", f"{commit}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    variantes = {"ambos": [False, True], "com": [True], "sem": [False]}[args.fotos]
+    resultados = []
+
+    if args.inicializacao:
+        pasta = tempfile.mkdtemp(prefix="aee_bench_")
+        try:
+            semear_sintetico(RepositorioLocal(os.path.join(pasta, "aee.db"), os.path.join(pasta, "storage")), 100, False)
+            ambiente = {**os.environ, "AEE_BACKEND": "local", "AEE_LOCAL_DB": os.path.join(pasta, "aee.db"), "AEE_LOCAL_STORAGE": os.path.join(pasta, "storage"),
+                        "AEE_CACHE_FOTOS": os.path.join(pasta, "cache_fotos"), "AEE_FILA_DB": os.path.join(pasta, "fila.db")}
+            for r in medir_inicializacao(ambiente, args.inicializacao):
+                resultados.append(r); print(f"  {r}", flush=True)
+        finally:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+    for escala in [int(e) for e in args.escalas.split(",")]:
+        for com_fotos in variantes:
+            pasta = tempfile.mkdtemp(prefix="aee_bench_")
+            try:
+                db, storage, cache = os.path.join(pasta, "aee.db"), os.path.join(pasta, "storage"), os.path.join(pasta, "cache_fotos")
+                repo = RepositorioLocal(db, storage)
+                t0 = time.perf_counter()
+                professores, alunos = semear_sintetico(repo, escala, com_fotos)
+                print(f"[{escala} relatórios, fotos={com_fotos}] semeado em {time.perf_counter() - t0:.1f}s", flush=True)
+
+                df_prof, df_est = pd.DataFrame(repo.listar_professores()), pd.DataFrame(repo.listar_estudantes())
+                contagem = Counter(r['registro_aluno'] for p in repo.iterar_relatorios("id, registro_aluno") for r in p)
+                reg_top = contagem.most_common(1)[0][0]
+                aluno = df_est[df_est['registro'] == reg_top].iloc[0]
+                base = {"escala": escala, "com_fotos": com_fotos}
+
+                for r in medir_documentos(repo, df_prof, df_est, aluno):
+                    resultados.append({**base, **r}); print(f"  {r}", flush=True)
+
+                if not args.sem_app:
+                    os.environ.update(AEE_BACKEND="local", AEE_LOCAL_DB=db, AEE_LOCAL_STORAGE=storage,
+                                      AEE_CACHE_FOTOS=cache, AEE_FILA_DB=os.path.join(pasta, "fila.db"))
+                    reg_aluno = str(aluno['registro'])  # os selectboxes de aluno têm o registro como valor
+                    cwd = os.getcwd(); os.chdir(RAIZ)  # o app resolve logo.png e cadastro_AEE.xlsx pela pasta atual
+                    try:
+                        for r in medir_paginas(reg_aluno, reg_aluno, cache, args.timeout):
+                            resultados.append({**base, **r}); print(f"  {r}", flush=True)
+                    finally:
+                        os.chdir(cwd)
+            finally:
+                shutil.rmtree(pasta, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump({"meta": {"commit": commit, "data": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                            "plataforma": platform.platform(), "escalas": args.escalas, "fotos": args.fotos},
+                   "resultados": resultados}, f, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {saida}")
+
+if __name__ == "__main__":
+    main()
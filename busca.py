@@ -0,0 +1,75 @@
+# --- BUSCA TEXTUAL NOS RELATÓRIOS (SQLite FTS5) ---
+# Índice em memória sobre disciplina_tema, planejado, realizado e motivo_nao_participou, alimentado pelo
+# cache de leitura dos relatórios: cada sincronização por delta só reindexa as linhas que mudaram.
+# O tokenizador unicode61 com remove_diacritics 2 ignora acentos ("comunicacao" acha "comunicação").
+import re
+import sqlite3
+import threading
+
+CAMPOS = ["disciplina_tema", "planejado", "realizado", "motivo_nao_participou"]
+FILTROS = ["registro_aluno", "rf_professor", "bimestre", "data"]
+PESOS = (3.0, 1.0, 1.0, 2.0)  # bm25: acerto no tema e no motivo pesa mais que no texto corrido
+POR_PAGINA = 20
+
+# Os filtros ficam numa tabela comum ligada pelo rowid: filtrar coluna UNINDEXED do FTS5 obriga a ler o
+# conteúdo de cada acerto, enquanto o join pela chave primária custa uma busca em B-tree.
+ESQUEMA = f"""
+CREATE VIRTUAL TABLE relatos USING fts5({", ".join(CAMPOS)}, tokenize = 'unicode61 remove_diacritics 2');
+CREATE TABLE meta (id INTEGER PRIMARY KEY, {", ".join(FILTROS)});
+"""
+
+
+def montar_consulta(texto):
+    """Converte o texto digitado numa consulta FTS5 segura: termos entre aspas viram frase, os demais são
+    combinados com AND e o último vale como prefixo (busca enquanto digita)."""
+    partes = re.findall(r'"([^"]+)"|(\S+)', texto or "")
+    termos = []
+    for i, (frase, palavra) in enumerate(partes):
+        t = (frase or palavra).replace('"', "").strip()
+        if not t: continue
+        prefixo = "*" if palavra and i == len(partes) - 1 else ""
+        termos.append(f'"{t}"{prefixo}')
+    return " ".join(termos)
+
+
+class IndiceBusca:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.con = sqlite3.connect(":memory:", check_same_thread=False)
+        self.con.executescript(ESQUEMA)
+        self.total = 0
+
+    def aplicar(self, alterados, excluidos, recarga=False):
+        """Mesmo contrato dos ouvintes do cache de relatórios: linhas novas/alteradas, lápides e recarga total."""
+        with self.lock, self.con:
+            if recarga:
+                self.con.execute("DELETE FROM relatos"); self.con.execute("DELETE FROM meta")
+            ids = [(l['id'],) for l in alterados] + [(e['id'],) for e in excluidos]
+            if ids and not recarga:
+                self.con.executemany("DELETE FROM relatos WHERE rowid = ?", ids)
+                self.con.executemany("DELETE FROM meta WHERE id = ?", ids)
+            for tabela, chave, cols in (("relatos", "rowid", CAMPOS), ("meta", "id", FILTROS)):
+                self.con.executemany(f"INSERT INTO {tabela} ({chave}, {', '.join(cols)}) VALUES (?{', ?' * len(cols)})",
+                                     [(l['id'], *(str(l.get(c) or "") for c in cols)) for l in alterados])
+            self.total = self.con.execute("SELECT COUNT(*) FROM meta").fetchone()[0]
+
+    def buscar(self, texto, registros=None, rf_professor=None, bimestre=None, pagina=0, por_pagina=POR_PAGINA):
+        """Devolve (total de acertos, linhas da página) ordenadas por relevância (bm25)."""
+        consulta = montar_consulta(texto)
+        if not consulta: return 0, []
+        filtros, params = ["relatos MATCH ?"], [consulta]
+        if registros is not None:
+            registros = list(registros)
+            if not registros: return 0, []
+            filtros.append(f"m.registro_aluno IN ({', '.join('?' for _ in registros)})"); params.extend(registros)
+        if rf_professor is not None: filtros.append("m.rf_professor = ?"); params.append(rf_professor)
+        if bimestre is not None: filtros.append("m.bimestre = ?"); params.append(bimestre)
+        where = " AND ".join(filtros)
+        with self.lock:
+            total = self.con.execute(f"SELECT COUNT(*) FROM relatos JOIN meta m ON m.id = relatos.rowid WHERE {where}", params).fetchone()[0]
+            cur = self.con.execute(
+                f"""SELECT m.id, {", ".join(f"m.{c}" for c in FILTROS)}, disciplina_tema, snippet(relatos, -1, '**', '**', ' … ', 16)
+                    FROM relatos JOIN meta m ON m.id = relatos.rowid WHERE {where}
+                    ORDER BY bm25(relatos, {", ".join(map(str, PESOS))}) LIMIT ? OFFSET ?""", params + [por_pagina, pagina * por_pagina])
+            nomes = ["id"] + FILTROS + ["disciplina_tema", "trecho"]
+            return total, [dict(zip(nomes, r)) for r in cur.fetchall()]
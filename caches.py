@@ -0,0 +1,213 @@
+# --- CACHES EM MEMÓRIA E EM DISCO COMPARTILHADOS ENTRE SESSÕES ---
+# CacheRelatorios: cópia da tabela relatorios mantida por delta (atualizado_em + lápides), indexada por aluno
+# e por professor. CacheFotos: fotos do Storage em disco, original e miniatura, com eviction LRU. MemoDocumentos:
+# bytes dos .docx já montados, LRU pelo tamanho total. O app cria um de cada com st.cache_resource.
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from repositorio import ler_instante
+
+INTERVALO_DELTA = 15     # segundos mínimos entre duas buscas de delta (gravações do próprio app forçam antes)
+SOBREPOSICAO_DELTA = 60  # segundos relidos antes da marca: cobre transações confirmadas fora de ordem
+POR_PAGINA_EDICAO = 20   # registros por página no seletor de "Alterar ou Excluir"
+LADO_MINIATURA = 200     # px (o avatar é exibido com 100px; o dobro fica nítido em telas de alta densidade)
+
+
+class CacheRelatorios:
+    def __init__(self, repo, intervalo=INTERVALO_DELTA):
+        self.repo = repo
+        self.intervalo = intervalo
+        self.lock = threading.Lock()             # protege os dados
+        self.lock_sincronia = threading.Lock()   # uma busca de delta por vez
+        self.linhas = {}                         # id -> linha completa
+        self.por_aluno = defaultdict(set)        # registro_aluno -> ids
+        self.por_professor = defaultdict(set)    # rf_professor -> ids
+        self.marca = None                        # maior atualizado_em / excluido_em já aplicado
+        self.ultima = 0.0
+        self.sujo = True
+        self.sincronias = 0
+        self.linhas_recebidas = 0
+        self.ouvintes = []                       # fn(alterados, excluidos, recarga), p.ex. o índice de busca
+
+    def assinar(self, ouvinte):
+        """Registra um ouvinte e já entrega a ele tudo o que está em memória."""
+        with self.lock:
+            self.ouvintes.append(ouvinte)
+            ouvinte(list(self.linhas.values()), [], True)
+
+    def marcar_sujo(self):
+        self.sujo = True
+
+    def _remover(self, id_rel):
+        antiga = self.linhas.pop(id_rel, None)
+        if antiga is not None:
+            self.por_aluno[str(antiga.get('registro_aluno'))].discard(id_rel)
+            self.por_professor[str(antiga.get('rf_professor'))].discard(id_rel)
+
+    def _aplicar(self, alterados, excluidos, recarga):
+        with self.lock:
+            if recarga:
+                self.linhas, self.por_aluno, self.por_professor = {}, defaultdict(set), defaultdict(set)
+            for l in alterados:
+                self._remover(l['id'])
+                self.linhas[l['id']] = l
+                self.por_aluno[str(l.get('registro_aluno'))].add(l['id'])
+                self.por_professor[str(l.get('rf_professor'))].add(l['id'])
+            for e in excluidos: self._remover(e['id'])
+            marcas = [m for m in [self.marca] + [l.get('atualizado_em') for l in alterados] + [e['excluido_em'] for e in excluidos] if m]
+            self.marca = max(marcas, key=ler_instante) if marcas else None
+            self.sincronias += 1
+            self.linhas_recebidas += len(alterados)
+            for ouvinte in self.ouvintes: ouvinte(alterados, excluidos, recarga)
+
+    def sincronizar(self):
+        forcar = self.sujo
+        if not forcar and time.monotonic() - self.ultima < self.intervalo: return
+        if not self.lock_sincronia.acquire(blocking=forcar or self.marca is None): return  # outra sessão já está buscando
+        try:
+            self.sujo = False
+            marca = self.marca
+            try:
+                if marca is None:
+                    alterados, excluidos = [l for pagina in self.repo.iterar_relatorios("*") for l in pagina], []
+                else:
+                    desde = (ler_instante(marca) - timedelta(seconds=SOBREPOSICAO_DELTA)).isoformat()
+                    alterados, excluidos = self.repo.relatorios_alterados_desde(desde), self.repo.exclusoes_desde(desde)
+            except Exception:
+                if marca is None and not self.linhas: raise
+                self.sujo = forcar  # mantém os dados que já tem e tenta de novo no próximo rerun
+                return
+            self._aplicar(alterados, excluidos, recarga=marca is None)
+            self.ultima = time.monotonic()
+        finally:
+            self.lock_sincronia.release()
+
+    def do_aluno(self, registro, rf_professor=None):
+        """Relatórios do aluno em ordem de id; com rf_professor, só os daquele professor (regra de visibilidade)."""
+        self.sincronizar()
+        with self.lock:
+            ids = self.por_aluno.get(str(registro), set())
+            if rf_professor is not None: ids = ids & self.por_professor.get(str(rf_professor), set())
+            return [self.linhas[i] for i in sorted(ids)]
+
+    def resumo_do_aluno(self, registro, rf_professor=None, bimestre=None, de=None, ate=None, pagina=0, por_pagina=POR_PAGINA_EDICAO):
+        """Projeção leve (id, data, bimestre, disciplina_tema), filtrada por bimestre e período e paginada,
+        da aula mais recente para a mais antiga. Devolve (total filtrado, página, itens da página); a página é
+        limitada à última existente (excluir o único item da última página não deixa a lista vazia)."""
+        self.sincronizar()
+        with self.lock:
+            ids = self.por_aluno.get(str(registro), set())
+            if rf_professor is not None: ids = ids & self.por_professor.get(str(rf_professor), set())
+            itens = [{c: self.linhas[i].get(c) for c in ("id", "data", "bimestre", "disciplina_tema")} for i in ids]
+        if bimestre is not None: itens = [r for r in itens if r['bimestre'] == bimestre]
+        for r in itens:  # 'data' é texto dd/mm/aaaa
+            try: r['dia'] = datetime.strptime(str(r['data']), '%d/%m/%Y').date()
+            except ValueError: r['dia'] = None
+        if de is not None: itens = [r for r in itens if r['dia'] is not None and r['dia'] >= de]
+        if ate is not None: itens = [r for r in itens if r['dia'] is not None and r['dia'] <= ate]
+        itens.sort(key=lambda r: (r['dia'] is not None, r['dia'] or datetime.min.date(), r['id']), reverse=True)
+        pagina = min(pagina, max(0, -(-len(itens) // por_pagina) - 1))
+        return len(itens), pagina, itens[pagina * por_pagina:(pagina + 1) * por_pagina]
+
+
+class CacheFotos:
+    def __init__(self, pasta, limite_bytes, baixar):
+        self.pasta = pasta
+        self.limite = limite_bytes
+        self.baixar = baixar  # (bucket, caminho) -> bytes
+        self.lock = threading.Lock()
+        self.indice = OrderedDict()  # arquivo -> tamanho, do menos para o mais recente
+        self.total = 0
+        os.makedirs(pasta, exist_ok=True)
+        existentes = []
+        for nome in os.listdir(pasta):
+            arq = os.path.join(pasta, nome)
+            if nome.endswith(".tmp"): os.remove(arq); continue
+            st_arq = os.stat(arq); existentes.append((st_arq.st_mtime, arq, st_arq.st_size))
+        for _, arq, tam in sorted(existentes):
+            self.indice[arq] = tam; self.total += tam
+
+    def _arquivo(self, nivel, bucket, caminho):
+        return os.path.join(self.pasta, f"{nivel}_{bucket}_{hashlib.sha1(caminho.encode()).hexdigest()}")
+
+    def _ler(self, arq):
+        with self.lock:
+            if arq not in self.indice: return None
+            self.indice.move_to_end(arq)
+        try:
+            with open(arq, "rb") as f: dados = f.read()
+            os.utime(arq)  # mantém a ordem LRU entre reinícios do servidor
+            return dados
+        except OSError:
+            with self.lock:
+                self.total -= self.indice.pop(arq, 0)
+            return None
+
+    def _gravar(self, arq, dados):
+        tmp = f"{arq}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f: f.write(dados)
+        os.replace(tmp, arq)
+        with self.lock:
+            self.total += len(dados) - self.indice.pop(arq, 0)
+            self.indice[arq] = len(dados)
+            while self.total > self.limite and len(self.indice) > 1:
+                velho, tam = self.indice.popitem(last=False); self.total -= tam
+                try: os.remove(velho)
+                except OSError: pass
+
+    def original(self, bucket, caminho):
+        arq = self._arquivo("orig", bucket, caminho)
+        dados = self._ler(arq)
+        if dados is None:
+            dados = self.baixar(bucket, caminho)
+            self._gravar(arq, dados)
+        return dados
+
+    def miniatura(self, bucket, caminho):
+        arq = self._arquivo("mini", bucket, caminho)
+        dados = self._ler(arq)
+        if dados is None:
+            from PIL import Image, ImageOps
+            img = ImageOps.exif_transpose(Image.open(BytesIO(self.original(bucket, caminho)))).convert("RGB")
+            img.thumbnail((LADO_MINIATURA, LADO_MINIATURA))
+            buf = BytesIO(); img.save(buf, "JPEG", quality=85); dados = buf.getvalue()
+            self._gravar(arq, dados)
+        return dados
+
+    def invalidar(self, bucket, caminho):
+        for nivel in ("orig", "mini"):
+            arq = self._arquivo(nivel, bucket, caminho)
+            with self.lock:
+                self.total -= self.indice.pop(arq, 0)
+            try: os.remove(arq)
+            except OSError: pass
+
+
+class MemoDocumentos:
+    def __init__(self, limite_bytes):
+        self.limite = limite_bytes
+        self.lock = threading.Lock()
+        self.itens = OrderedDict()  # chave -> bytes, do menos para o mais recente
+        self.total = 0
+
+    def consultar(self, chave):
+        with self.lock:
+            dados = self.itens.get(chave)
+            if dados is not None: self.itens.move_to_end(chave)
+            return dados
+
+    def obter(self, chave, gerar):
+        dados = self.consultar(chave)
+        if dados is not None: return dados
+        dados = gerar()
+        with self.lock:
+            if chave not in self.itens:
+                self.itens[chave] = dados; self.total += len(dados)
+            while self.total > self.limite and len(self.itens) > 1:
+                _, velho = self.itens.popitem(last=False); self.total -= len(velho)
+        return dados
@@ -0,0 +1,37 @@
+# --- ÍNDICES DO CADASTRO (estudantes e professores) ---
+# Montado uma vez por carga das tabelas em cache e compartilhado entre sessões: busca por registro e por RF
+# em O(1) e listas de registros já ordenadas pelo rótulo "Aluno - Turma", no geral e por turma. As telas
+# usam selectbox com o registro como valor e o rótulo só na exibição, então nomes repetidos não se confundem.
+from collections import defaultdict
+
+
+class Cadastro:
+    def __init__(self, df_alunos, df_professores):
+        self.df_alunos = df_alunos
+        self.df_professores = df_professores
+        self.alunos = {str(a['registro']): a for a in df_alunos.to_dict("records")} if not df_alunos.empty else {}
+        self.professores = {str(p['rf']): p for p in df_professores.to_dict("records")} if not df_professores.empty else {}
+        self.rotulos = {reg: f"{a['aluno']} - {a['turma']}" for reg, a in self.alunos.items()}
+        self.registros = sorted(self.alunos, key=lambda r: (self.rotulos[r].casefold(), r))
+        por_turma = defaultdict(list)
+        for reg in self.registros: por_turma[self.alunos[reg]['turma']].append(reg)
+        self.por_turma = dict(por_turma)
+        self.turmas = sorted(self.por_turma)
+        self.nomes_professores = {rf: p['nome'] for rf, p in self.professores.items()}
+        self.rfs = sorted(self.professores, key=lambda rf: (str(self.nomes_professores[rf]).casefold(), rf))
+
+    def aluno(self, registro):
+        return self.alunos.get(str(registro))
+
+    def professor(self, rf):
+        return self.professores.get(str(rf))
+
+    def rotulo(self, registro):
+        return self.rotulos.get(str(registro), str(registro))
+
+    def nome_professor(self, rf, padrao=None):
+        return self.nomes_professores.get(str(rf), str(rf) if padrao is None else padrao)
+
+    def rfs_visiveis(self, perfil_usuario):
+        """Professores que o usuário pode editar/resetar: só a gestão mexe em contas de gestão."""
+        return self.rfs if perfil_usuario == "gestao" else [rf for rf in self.rfs if self.professores[rf].get('perfil') != 'gestao']
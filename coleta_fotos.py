@@ -0,0 +1,50 @@
+# --- COLETA DE FOTOS ÓRFÃS NO STORAGE (fotos_aee / fotos_perfil) ---
+# Lista os dois buckets em páginas e compara com as colunas foto_path de relatorios e estudantes. O que não é
+# referenciado por nenhuma linha é órfão (foto substituída na edição, aluno/relatório apagado, ZERAR TUDO).
+# Objetos recentes ficam de fora: a fila de envio e o editor sobem a foto antes de gravar a linha que a usa.
+import os
+import time
+
+from repositorio import BUCKETS
+
+CARENCIA = 24 * 3600  # segundos: objeto mais novo que isso nunca é considerado órfão
+LOTE_REMOCAO = 100    # caminhos por chamada de remoção
+
+
+def fotos_referenciadas(repo):
+    """Nomes citados em relatorios.foto_path ou estudantes.foto_path, lidos direto do banco em páginas (keyset):
+    uma leitura truncada em 1000 linhas faria fotos em uso parecerem órfãs."""
+    usadas = {os.path.basename(l['foto_path']) for p in repo.iterar_relatorios("id, foto_path") for l in p if l.get('foto_path')}
+    usadas.update(os.path.basename(e['foto_path']) for p in repo.iterar_estudantes("registro, foto_path") for e in p if e.get('foto_path'))
+    return usadas
+
+
+def levantar_orfaos(repo, carencia=CARENCIA, progresso=None):
+    """Devolve {bucket: [{nome, bytes, criado_em}]} com os objetos órfãos. Não apaga nada."""
+    usadas = fotos_referenciadas(repo)
+    limite = time.time() - carencia
+    orfaos = {}
+    for bucket in BUCKETS:
+        orfaos[bucket], vistos = [], 0
+        for pagina in repo.iterar_fotos(bucket):
+            vistos += len(pagina)
+            orfaos[bucket].extend(f for f in pagina if f['nome'] not in usadas and f['criado_em'] < limite)
+            if progresso: progresso(bucket, vistos, len(orfaos[bucket]))
+    return orfaos
+
+
+def remover_orfaos(repo, orfaos, lote=LOTE_REMOCAO, progresso=None):
+    """Apaga em lotes. Devolve (removidos, bytes liberados, falhas); um lote que falha não interrompe os demais."""
+    total = sum(len(v) for v in orfaos.values())
+    processados, feitos, liberados, falhas = 0, 0, 0, []
+    for bucket, itens in orfaos.items():
+        for i in range(0, len(itens), lote):
+            parte = itens[i:i + lote]
+            processados += len(parte)
+            try:
+                repo.remover_fotos(bucket, [f['nome'] for f in parte])
+                feitos += len(parte); liberados += sum(f['bytes'] for f in parte)
+            except Exception as e:
+                falhas.append(f"{bucket} ({len(parte)} arquivos): {e}")
+            if progresso: progresso(processados, total)
+    return feitos, liberados, falhas
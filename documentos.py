@@ -0,0 +1,155 @@
+# --- GERAÇÃO DOS DOCUMENTOS (WORD / EXCEL) DO AEE CONECTA ---
+# Funções puras de montagem, sem Streamlit: recebem os dados e uma função obter_foto(bucket, caminho) -> bytes,
+# para que o app (com o cache de fotos) e os benchmarks (benchmarks/bench_aee.py) usem exatamente o mesmo código.
+# python-docx e openpyxl são importados dentro das funções: a maioria dos reruns (inclusive o login) nunca
+# monta documento, e assim não paga o custo de carregar essas bibliotecas.
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import BytesIO
+
+LARGURA_FOTO_PERFIL = 2.5  # polegadas (folha de rosto)
+LARGURA_FOTO_AULA = 3.5    # polegadas (relatório de aula)
+
+def _docx():
+    from docx import Document
+    from docx.shared import Inches
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    return Document, Inches, WD_ALIGN_PARAGRAPH
+
+def gerar_folha_rosto(dados, obter_foto):
+    Document, Inches, WD_ALIGN_PARAGRAPH = _docx()
+    doc = Document()
+    h = doc.add_paragraph(); h.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    h.add_run("CEU EMEF Prof.ª MARA CRISTINA TARTAGLIA SENA\nAEE - ATENDIMENTO EDUCACIONAL ESPECIALIZADO\nREGISTRO - ATIVIDADE FLEXIBILIZADA").bold = True
+    doc.add_paragraph(f"ANO LETIVO {datetime.now().year}").alignment = WD_ALIGN_PARAGRAPH.CENTER
+    
+    if dados.get('foto_path'):
+        try:
+            res_foto = obter_foto("fotos_perfil", dados['foto_path'])
+            doc.add_picture(BytesIO(res_foto), width=Inches(LARGURA_FOTO_PERFIL))
+            doc.paragraphs[-1].alignment = WD_ALIGN_PARAGRAPH.CENTER
+        except:
+            pass
+
+    t = doc.add_table(rows=4, cols=1); t.style = 'Table Grid'
+    t.rows[0].cells[0].text = f"ESTUDANTE: {dados.get('aluno', 'N/A')}"
+    t.rows[1].cells[0].text = f"TURMA: {dados.get('turma', 'N/A')}"
+    col_nec = next((x for x in list(dados.keys()) if "nec" in x), "necessidades")
+    t.rows[2].cells[0].text = f"DEFICIÊNCIA/CONDIÇÃO: {dados.get(col_nec, 'N/A')}"
+    t.rows[3].cells[0].text = f"DATA DE NASCIMENTO: {dados.get('data_nascimento', 'N/A')}"
+    
+    doc.add_heading('PERFIL E OBSERVAÇÕES DO PROFESSOR PAEE:', level=3)
+    doc.add_paragraph(str(dados.get('observacoes_gerais', '')))
+    
+    buf = BytesIO(); doc.save(buf); buf.seek(0); return buf
+
+# Pré-busca das fotos das aulas: todas as imagens do documento são baixadas em paralelo antes da montagem,
+# em vez de uma ida ao Storage por aula no meio do laço.
+MAX_THREADS_FOTOS = 8
+TIMEOUT_FOTO = 15  # segundos por imagem
+
+def prebuscar_fotos(obter_foto, bucket, caminhos):
+    """Retorna {caminho: bytes}; fotos ausentes, com erro ou que estouram o tempo ficam como None."""
+    caminhos = list(dict.fromkeys(c for c in caminhos if c))
+    if not caminhos: return {}
+    fotos = {}
+    pool = ThreadPoolExecutor(max_workers=min(MAX_THREADS_FOTOS, len(caminhos)))
+    futuros = {c: pool.submit(obter_foto, bucket, c) for c in caminhos}
+    for c, fut in futuros.items():
+        try: fotos[c] = fut.result(timeout=TIMEOUT_FOTO)
+        except Exception: fotos[c] = None
+    pool.shutdown(wait=False, cancel_futures=True)
+    return fotos
+
+def gerar_relatorio_aula(df_rels, nome_aluno, turma_aluno, nomes_professores, obter_foto, tempos=None):
+    """nomes_professores: dict rf -> nome (Cadastro.nomes_professores)."""
+    t0 = time.perf_counter()
+    fotos = prebuscar_fotos(obter_foto, "fotos_aee", df_rels['foto_path'].tolist())
+    t1 = time.perf_counter()
+    Document, Inches, WD_ALIGN_PARAGRAPH = _docx()
+    doc = Document()
+    for i, (_, row) in enumerate(df_rels.iterrows()):
+        nome_p = nomes_professores.get(str(row['rf_professor']), "Professor não identificado")
+
+        h = doc.add_paragraph(); h.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        h.add_run("CEU EMEF Prof.ª MARA CRISTINA TARTAGLIA SENA\nAEE - ATENDIMENTO EDUCACIONAL ESPECIALIZADO\nREGISTRO - ATIVIDADE FLEXIBILIZADA").bold = True
+        p_title = doc.add_paragraph(); p_title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        p_title.add_run(f"{row['bimestre']} – ANO LETIVO {datetime.now().year}").bold = True
+        
+        doc.add_paragraph(f"ESTUDANTE: {nome_aluno}\nTURMA: {turma_aluno}")
+        doc.add_paragraph(f"PROFESSOR: {nome_p} | DISCIPLINA/TEMA: {row.get('disciplina_tema', 'N/A')}")
+        
+        p_sim = "x" if row.get('participou_aula') == "Sim" else " "
+        p_nao = "x" if row.get('participou_aula') == "Não" else " "
+        txt_part = doc.add_paragraph(f"O ESTUDANTE PARTICIPOU DA SUA AULA? ( {p_sim} ) SIM ( {p_nao} ) NÃO.")
+        if row.get('participou_aula') == "Não":
+            txt_part.add_run(f" RELATE O MOTIVO: {row.get('motivo_nao_participou', '')}")
+            
+        doc.add_heading('ATIVIDADES PLANEJADAS:', level=3); doc.add_paragraph(str(row['planejado']))
+        doc.add_heading('ATIVIDADE REALIZADA COM O ESTUDANTE:', level=3); doc.add_paragraph(str(row['realizado']))
+        
+        if fotos.get(row['foto_path']):
+            try:
+                doc.add_picture(BytesIO(fotos[row['foto_path']]), width=Inches(LARGURA_FOTO_AULA)); doc.paragraphs[-1].alignment = WD_ALIGN_PARAGRAPH.CENTER
+            except: pass
+        
+        doc.add_heading('COMO FOI A PARTICIPAÇÃO DO ESTUDANTE?', level=3)
+        parts = str(row['participacao']).split(", ")
+        opcoes = ["REALIZOU COM AUTONOMIA", "REALIZOU COM APOIO E INTERVENÇÃO DE UM ADULTO", "REALIZOU WITH APOIO DE UM COLEGA", "NÃO REALIZOU"]
+        for op in opcoes:
+            check = "x" if op in parts else " "
+            doc.add_paragraph(f"( {check} ) {op}")
+        
+        doc.add_paragraph(f"\nDATA DE REALIZAÇÃO DA ATIVIDADE: {row['data']}")
+        if i < len(df_rels) - 1: doc.add_page_break()
+    buf = BytesIO(); doc.save(buf); buf.seek(0)
+    if tempos is not None:
+        tempos.update(busca_fotos=t1 - t0, montagem=time.perf_counter() - t1, fotos=len(fotos), fotos_falhas=sum(v is None for v in fotos.values()))
+    return buf
+
+# Planilha de monitoramento: lê só as colunas necessárias, página a página, e escreve cada linha direto
+# numa planilha openpyxl write-only em disco. As abas de resumo são contadores acumulados durante a leitura.
+BIMESTRES = ["1º Bimestre", "2º Bimestre", "3º Bimestre", "4º Bimestre"]
+
+def exportar_monitoramento(repo, df_professores, df_estudantes):
+    """Gera o monitor.xlsx num arquivo temporário e devolve (caminho, total de relatórios)."""
+    from openpyxl import Workbook
+    nomes_prof = dict(zip(df_professores['rf'].astype(str), df_professores['nome'])) if not df_professores.empty else {}
+    alunos = {str(r): (a, t) for r, a, t in zip(df_estudantes['registro'], df_estudantes['aluno'], df_estudantes['turma'])} if not df_estudantes.empty else {}
+    por_prof_bim, por_aluno, total = Counter(), Counter(), 0
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Relatórios")
+    ws.append(['Professor', 'Aluno', 'Turma', 'Data', 'Bimestre'])
+    for pagina in repo.iterar_relatorios("id, rf_professor, registro_aluno, data, bimestre"):
+        for r in pagina:
+            prof = nomes_prof.get(str(r['rf_professor']))
+            aluno, turma = alunos.get(str(r['registro_aluno']), (None, None))
+            ws.append([prof, aluno, turma, r['data'], r['bimestre']])
+            por_prof_bim[(prof or f"RF {r['rf_professor']}", r['bimestre'])] += 1
+            por_aluno[str(r['registro_aluno'])] += 1
+            total += 1
+
+    ws = wb.create_sheet("Professor x Bimestre")
+    ws.append(['Professor'] + BIMESTRES + ['Total'])
+    for prof in sorted({p for p, _ in por_prof_bim}):
+        linha = [por_prof_bim.get((prof, b), 0) for b in BIMESTRES]
+        ws.append([prof] + linha + [sum(v for (p, _), v in por_prof_bim.items() if p == prof)])
+
+    ws = wb.create_sheet("Por Aluno")
+    ws.append(['Registro', 'Aluno', 'Turma', 'Relatórios'])
+    for reg, n in sorted(por_aluno.items(), key=lambda x: (-x[1], x[0])):
+        aluno, turma = alunos.get(reg, (None, None))
+        ws.append([reg, aluno, turma, n])
+
+    ws = wb.create_sheet("Sem Relatórios")
+    ws.append(['Registro', 'Aluno', 'Turma'])
+    for reg, (aluno, turma) in sorted(alunos.items(), key=lambda x: (str(x[1][1]), str(x[1][0]))):
+        if reg not in por_aluno: ws.append([reg, aluno, turma])
+
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx"); tmp.close()
+    wb.save(tmp.name)
+    return tmp.name, total
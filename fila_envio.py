@@ -0,0 +1,127 @@
+# --- FILA LOCAL DE ENVIO DOS RELATÓRIOS (outbox em SQLite) ---
+# O "Salvar" grava aqui na hora e uma thread em segundo plano envia fotos e relatórios ao repositório em
+# lotes, com novas tentativas. Cada relatório leva uma chave única (chave_envio) e o insert é um upsert por
+# essa chave, então um reenvio nunca duplica o registro.
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from documentos import MAX_THREADS_FOTOS
+
+INTERVALO_SINCRONIA = 5            # segundos entre varreduras da fila
+LOTE_SINCRONIA = 50                # relatórios por insert
+ESPERA_MAX_RETENTATIVA = 300       # segundos
+RETENCAO_ENVIADOS = 7 * 24 * 3600  # segundos que um item já enviado fica na fila (só para a contagem)
+# Lote recusado é dividido ao meio até isolar as linhas ruins. Enquanto nenhum pedaço passa pode ser o servidor
+# fora do ar, não uma linha inválida: depois de tantas recusas sem nenhum sucesso o resto volta para a fila.
+MAX_RECUSAS_SEM_SUCESSO = 2 * LOTE_SINCRONIA.bit_length() + 2
+
+
+class FilaEnvio:
+    def __init__(self, caminho, repo):
+        self.caminho = caminho
+        self.repo = repo
+        self.sinal = threading.Event()
+        self.ao_enviar = None  # chamado depois de cada lote gravado no repositório
+        with self._conectar() as con:
+            con.execute("""CREATE TABLE IF NOT EXISTS fila (
+                chave TEXT PRIMARY KEY, dados TEXT NOT NULL, foto BLOB, foto_tipo TEXT,
+                status TEXT NOT NULL DEFAULT 'pendente', tentativas INTEGER NOT NULL DEFAULT 0,
+                proxima_tentativa REAL NOT NULL DEFAULT 0, erro TEXT, criado_em REAL NOT NULL, enviado_em REAL)""")
+            con.execute("CREATE INDEX IF NOT EXISTS ix_fila_status ON fila (status, proxima_tentativa)")
+
+    def _conectar(self):
+        con = sqlite3.connect(self.caminho, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def enfileirar(self, itens):
+        """itens: lista de (linha de relatorios, bytes da foto ou None, content-type). Grava tudo numa transação."""
+        agora = time.time()
+        with self._conectar() as con:
+            for dados, foto, tipo in itens:
+                dados = dict(dados); dados.setdefault("chave_envio", uuid.uuid4().hex)
+                con.execute("INSERT OR IGNORE INTO fila (chave, dados, foto, foto_tipo, criado_em) VALUES (?, ?, ?, ?, ?)",
+                            (dados["chave_envio"], json.dumps(dados), foto, tipo, agora))
+        self.sinal.set()
+
+    def contagem(self):
+        with self._conectar() as con:
+            c = dict(con.execute("SELECT status, COUNT(*) FROM fila GROUP BY status").fetchall())
+        return c.get("pendente", 0), c.get("enviado", 0)
+
+    def com_erro(self, limite=20):
+        """Itens pendentes cuja última tentativa falhou, do mais antigo para o mais novo."""
+        with self._conectar() as con:
+            linhas = con.execute("""SELECT dados, tentativas, erro FROM fila WHERE status = 'pendente' AND erro IS NOT NULL
+                                     ORDER BY criado_em LIMIT ?""", (limite,)).fetchall()
+        return [{**json.loads(dados), "tentativas": tent, "erro": erro} for dados, tent, erro in linhas]
+
+    def _falhou(self, con, chave, tentativas, erro):
+        espera = min(ESPERA_MAX_RETENTATIVA, 5 * 2 ** tentativas)
+        con.execute("UPDATE fila SET tentativas = ?, proxima_tentativa = ?, erro = ? WHERE chave = ?",
+                    (tentativas + 1, time.time() + espera, str(erro)[:500], chave))
+
+    def _gravar_isolando(self, prontos):
+        """Grava [(chave, dados, tentativas)]. Devolve (gravados, [(chave, tentativas, erro)])."""
+        gravados, falhas, pilha, recusas = [], [], [prontos], 0
+        while pilha:
+            parte = pilha.pop()
+            if recusas >= MAX_RECUSAS_SEM_SUCESSO and not gravados:
+                falhas.extend((chave, tent, erro) for chave, _, tent in parte); continue
+            try:
+                self.repo.gravar_relatorios([d for _, d, _ in parte])
+                gravados.extend(parte)
+            except Exception as e:
+                erro, recusas = e, recusas + 1
+                if len(parte) == 1: falhas.append((parte[0][0], parte[0][2], e))
+                else: pilha.extend([parte[len(parte) // 2:], parte[:len(parte) // 2]])
+        return gravados, falhas
+
+    def sincronizar(self):
+        """Envia um lote. Retorna True se ainda pode haver itens prontos para envio."""
+        with self._conectar() as con:
+            lote = con.execute("""SELECT chave, dados, foto, foto_tipo, tentativas FROM fila
+                                  WHERE status = 'pendente' AND proxima_tentativa <= ? ORDER BY criado_em LIMIT ?""",
+                               (time.time(), LOTE_SINCRONIA)).fetchall()
+        if not lote: return False
+        itens = [(chave, json.loads(dados), foto, tipo, tent) for chave, dados, foto, tipo, tent in lote]
+
+        # Fotos do lote sobem em paralelo; a que falhar segura só o seu relatório para a próxima tentativa
+        def subir(item):
+            try:
+                self.repo.gravar_foto("fotos_aee", item[1]["foto_path"], item[2], item[3], upsert=True)
+            except Exception as e:
+                return e
+        com_foto = [it for it in itens if it[2] is not None]
+        erros = {}
+        if com_foto:
+            with ThreadPoolExecutor(max_workers=min(MAX_THREADS_FOTOS, len(com_foto))) as pool:
+                erros = {it[0]: e for it, e in zip(com_foto, pool.map(subir, com_foto)) if e is not None}
+
+        prontos = []
+        with self._conectar() as con:
+            for chave, dados, foto, tipo, tent in itens:
+                if chave in erros: self._falhou(con, chave, tent, erros[chave]); continue
+                if foto is not None: con.execute("UPDATE fila SET foto = NULL WHERE chave = ?", (chave,))
+                prontos.append((chave, dados, tent))
+        if not prontos: return len(lote) == LOTE_SINCRONIA
+        gravados, falhas = self._gravar_isolando(prontos)
+        agora = time.time()
+        with self._conectar() as con:
+            for chave, tent, erro in falhas: self._falhou(con, chave, tent, erro)
+            con.executemany("UPDATE fila SET status = 'enviado', enviado_em = ?, erro = NULL WHERE chave = ?", [(agora, c) for c, _, _ in gravados])
+            con.execute("DELETE FROM fila WHERE status = 'enviado' AND enviado_em < ?", (agora - RETENCAO_ENVIADOS,))
+        if gravados and self.ao_enviar: self.ao_enviar()
+        return bool(gravados) and len(lote) == LOTE_SINCRONIA
+
+    def executar(self):
+        while True:
+            self.sinal.wait(INTERVALO_SINCRONIA); self.sinal.clear()
+            try:
+                while self.sincronizar(): pass
+            except Exception:
+                pass
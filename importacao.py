@@ -0,0 +1,107 @@
+# --- IMPORTAÇÃO EM LOTE DO CADASTRO DE ESTUDANTES (cadastro_AEE.xlsx) ---
+# Lê a aba "alunos", valida e normaliza todas as colunas de uma vez (operações vetorizadas do pandas),
+# compara com a tabela atual e grava em lotes, subindo as fotos de fotos_alunos/<registro>.jpg em paralelo.
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+COLUNAS = ["registro", "aluno", "turma", "necessidades", "data_nascimento", "observacoes_gerais"]
+OBRIGATORIAS = ["registro", "aluno", "turma"]
+TAMANHO_LOTE = 500
+MAX_THREADS_FOTOS = 8
+
+
+def ler_planilha(arquivo):
+    """Aceita caminho ou arquivo enviado; usa a aba 'alunos' (ou a última, se não houver)."""
+    abas = pd.read_excel(arquivo, sheet_name=None)
+    return abas["alunos"] if "alunos" in abas else list(abas.values())[-1]
+
+
+def normalizar_cadastro(df):
+    """Devolve (estudantes válidos, problemas). Linhas com erro ficam fora; data inválida só gera aviso."""
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    faltando = [c for c in OBRIGATORIAS if c not in df.columns]
+    if faltando: raise ValueError(f"Colunas obrigatórias ausentes na planilha: {', '.join(faltando)}")
+    df = df.dropna(how="all")
+    for c in COLUNAS + ["foto"]:
+        if c not in df.columns: df[c] = ""
+
+    txt = df[COLUNAS + ["foto"]].astype("string").fillna("").apply(lambda s: s.str.strip())
+    txt["registro"] = txt["registro"].str.replace(r"\.0$", "", regex=True)
+    txt["turma"] = txt["turma"].str.upper().str.replace(r"\s+", "", regex=True)
+
+    # Datas: aceita dd/mm/aaaa, aaaa-mm-dd, datetime do Excel e número de série do Excel
+    # aaaa-mm-dd (e datetime do Excel, que vira texto ISO) é lido como ISO; dayfirst só vale para o resto,
+    # senão o dateutil troca dia e mês de '2010-05-03'.
+    bruto = df["data_nascimento"]
+    texto = bruto.where(~bruto.apply(lambda v: isinstance(v, (int, float)))).astype("string").str.strip()
+    iso = texto.str.match(r"\d{4}-\d{1,2}-\d{1,2}").fillna(False).astype(bool)
+    datas = pd.to_datetime(texto.where(iso), format="ISO8601", errors="coerce")
+    datas = datas.fillna(pd.to_datetime(texto.where(~iso), dayfirst=True, errors="coerce", format="mixed"))
+    seriais = pd.to_numeric(bruto, errors="coerce")
+    datas = datas.fillna(pd.to_datetime(seriais.where(seriais.between(1, 80_000)), unit="D", origin="1899-12-30", errors="coerce"))
+    data_invalida = (txt["data_nascimento"] != "") & datas.isna()
+    txt["data_nascimento"] = datas.dt.strftime("%d/%m/%Y").fillna("")
+
+    checagens = {
+        "registro vazio": txt["registro"] == "",
+        "registro duplicado na planilha": txt["registro"].duplicated(keep=False) & (txt["registro"] != ""),
+        "nome vazio": txt["aluno"] == "",
+        "turma vazia": txt["turma"] == "",
+    }
+    erro = pd.concat(checagens, axis=1).any(axis=1)
+    mensagens = pd.Series("", index=txt.index)
+    for msg, mask in {**checagens, "data de nascimento inválida (ignorada)": data_invalida}.items():
+        mensagens = mensagens.mask(mask, mensagens + "; " + msg)
+    mensagens = mensagens.str.lstrip("; ")
+    problemas = pd.DataFrame({"Linha": txt.index + 2, "Registro": txt["registro"], "Aluno": txt["aluno"],
+                              "Problema": mensagens, "Descartada": erro})[mensagens != ""]
+    return txt[~erro].reset_index(drop=True), problemas.reset_index(drop=True)
+
+
+def comparar(df_novo, df_atual):
+    """Separa em (novos, alterados, inalterados). Células vazias na planilha não apagam o que já está cadastrado."""
+    # foto_path só existe na tabela atual: sem renomear, o merge não gera o sufixo _atual
+    atual = df_atual.reindex(columns=COLUNAS + ["foto_path"]).astype("string").fillna("").rename(columns={"foto_path": "foto_path_atual"})
+    m = df_novo.merge(atual, on="registro", how="left", suffixes=("", "_atual"), indicator=True)
+    novos = m[m["_merge"] == "left_only"].copy()
+    novos["foto_path_atual"] = ""
+    existentes = m[m["_merge"] == "both"].copy()
+    mudou = pd.Series(False, index=existentes.index)
+    for c in COLUNAS[1:]:
+        existentes[c] = existentes[c].where(existentes[c] != "", existentes[f"{c}_atual"])
+        mudou |= existentes[c] != existentes[f"{c}_atual"]
+    cols = COLUNAS + ["foto", "foto_path_atual"]
+    return novos[cols].reset_index(drop=True), existentes[mudou][cols].reset_index(drop=True), existentes[~mudou][cols].reset_index(drop=True)
+
+
+def importar(repo, novos, alterados, inalterados, pasta_fotos, normalizar, largura_pol, substituir_fotos=False, progresso=None):
+    """Sobe as fotos em paralelo e grava os estudantes em lotes de TAMANHO_LOTE.
+    normalizar(bytes, largura_pol) -> (bytes, extensão, content-type) é o mesmo pipeline dos uploads do app."""
+    todos = pd.concat([novos, alterados, inalterados], ignore_index=True)
+    todos["arquivo_foto"] = [os.path.join(pasta_fotos, os.path.basename(f) if f else f"{r}.jpg") for r, f in zip(todos["registro"], todos["foto"])]
+    precisa_foto = todos["arquivo_foto"].map(os.path.isfile) & ((todos["foto_path_atual"] == "") | substituir_fotos)
+
+    def subir(reg, arq):
+        try:
+            with open(arq, "rb") as f: dados, ext, tipo = normalizar(f.read(), largura_pol)
+            caminho = f"perfil_{reg}{ext}"
+            repo.gravar_foto("fotos_perfil", caminho, dados, tipo, upsert=True)
+            return caminho, None
+        except Exception as e:
+            return None, f"{reg}: {e}"
+
+    pendentes = todos[precisa_foto]
+    with ThreadPoolExecutor(max_workers=MAX_THREADS_FOTOS) as pool:
+        enviados = list(pool.map(subir, pendentes["registro"], pendentes["arquivo_foto"]))
+    todos["foto_path"] = todos["foto_path_atual"]
+    todos.loc[pendentes.index, "foto_path"] = [c or atual for (c, _), atual in zip(enviados, pendentes["foto_path_atual"])]
+
+    # Só vão para o banco os novos, os alterados e os que ganharam foto agora
+    gravar = pd.Series(todos.index < len(novos) + len(alterados), index=todos.index) | (todos["foto_path"] != todos["foto_path_atual"])
+    linhas = todos[gravar][COLUNAS + ["foto_path"]].to_dict("records")
+    for i in range(0, len(linhas), TAMANHO_LOTE):
+        repo.salvar_estudantes(linhas[i:i + TAMANHO_LOTE])
+        if progresso: progresso(min(i + TAMANHO_LOTE, len(linhas)), len(linhas))
+    return {"gravados": len(linhas), "fotos": [c for c, _ in enviados if c], "falhas_fotos": [e for _, e in enviados if e]}
@@ -0,0 +1,121 @@
+# --- INSTRUMENTAÇÃO POR RERUN DO AEE CONECTA ---
+# Mede cada chamada ao repositório (tabelas e Storage) e cada construtor de documento: duração, tamanho
+# do payload e quantidade, agrupados por rerun e por página. Desligada, nada daqui é instanciado e o app
+# usa o repositório e as funções originais diretamente (custo zero).
+import threading
+import time
+from collections import deque, defaultdict
+
+MAX_RERUNS = 500  # reruns guardados para o painel
+
+
+def _tamanho(obj):
+    """Tamanho aproximado (bytes/caracteres) do que entrou ou saiu de uma chamada."""
+    if obj is None: return 0
+    if isinstance(obj, (bytes, bytearray)): return len(obj)
+    if isinstance(obj, str): return len(obj)
+    if isinstance(obj, dict): return sum(len(str(v)) for v in obj.values() if v is not None)
+    if isinstance(obj, (list, tuple)): return sum(_tamanho(x) for x in obj)
+    if hasattr(obj, "getbuffer"): return obj.getbuffer().nbytes
+    return 0
+
+
+def percentil(valores, p):
+    if not valores: return 0.0
+    v = sorted(valores)
+    return v[min(len(v) - 1, int(round(p / 100 * (len(v) - 1))))]
+
+
+class Medidor:
+    def __init__(self, max_reruns=MAX_RERUNS):
+        self.lock = threading.Lock()
+        self.reruns = deque(maxlen=max_reruns)  # {"pagina", "duracao", "ops": [(nome, dur, bytes, rede)], "interrompido"}
+        self.segundo_plano = deque(maxlen=2000)  # chamadas fora de um rerun (fila de envio, pools de fotos)
+        self._local = threading.local()
+
+    def iniciar_rerun(self):
+        """Abre o rerun da thread atual e o devolve. O app guarda o rerun aberto na sessão: st.rerun(), st.stop()
+        e exceções saem do script antes da última linha, e aí quem fecha é o rerun seguinte."""
+        agora = time.perf_counter()
+        self._local.atual = {"inicio": agora, "ultimo": agora, "pagina": None, "ops": []}
+        return self._local.atual
+
+    def marcar_pagina(self, pagina):
+        atual = getattr(self._local, "atual", None)
+        if atual is not None: atual["pagina"] = pagina
+
+    def finalizar_rerun(self, atual, interrompido=False):
+        """Fecha um rerun uma única vez. Interrompido, o fim conhecido é o da última operação medida: usar o
+        início do rerun seguinte somaria o tempo que o usuário passou parado depois de um st.stop()."""
+        if atual is None or atual.get("fechado"): return
+        atual["fechado"] = True
+        if getattr(self._local, "atual", None) is atual: self._local.atual = None
+        fim = atual["ultimo"] if interrompido else time.perf_counter()
+        with self.lock:
+            self.reruns.append({"pagina": atual["pagina"], "duracao": fim - atual["inicio"], "ops": atual["ops"], "interrompido": interrompido})
+
+    def registrar(self, nome, duracao, tamanho, rede):
+        atual = getattr(self._local, "atual", None)
+        if atual is not None:
+            atual["ops"].append((nome, duracao, tamanho, rede)); atual["ultimo"] = time.perf_counter()
+        else:
+            with self.lock: self.segundo_plano.append((nome, duracao, tamanho, rede))
+
+    def embrulhar(self, nome, fn, rede=False):
+        def medido(*args, **kwargs):
+            t0 = time.perf_counter()
+            res = fn(*args, **kwargs)
+            self.registrar(nome, time.perf_counter() - t0, _tamanho(res) + sum(_tamanho(a) for a in args if isinstance(a, (bytes, list, dict))), rede)
+            return res
+        return medido
+
+    # --- agregados para o painel ---
+    def resumo_paginas(self):
+        with self.lock: reruns = list(self.reruns)
+        por_pagina = defaultdict(list)
+        for r in reruns: por_pagina[r["pagina"]].append(r)
+        linhas = []
+        for pagina, rs in por_pagina.items():
+            dur = [r["duracao"] * 1000 for r in rs]
+            rede = [sum(1 for op in r["ops"] if op[3]) for r in rs]
+            linhas.append({"Página": pagina, "Reruns": len(rs), "Interrompidos": sum(1 for r in rs if r.get("interrompido")), "p50 (ms)": round(percentil(dur, 50), 1), "p95 (ms)": round(percentil(dur, 95), 1),
+                           "Chamadas de rede / rerun": round(sum(rede) / len(rs), 2), "Bytes / rerun": int(sum(sum(op[2] for op in r["ops"]) for r in rs) / len(rs))})
+        return sorted(linhas, key=lambda l: -l["p95 (ms)"])
+
+    def resumo_operacoes(self, limite=15):
+        with self.lock:
+            ops = [op for r in self.reruns for op in r["ops"]] + list(self.segundo_plano)
+        por_op = defaultdict(list)
+        for nome, dur, tam, _ in ops: por_op[nome].append((dur * 1000, tam))
+        linhas = [{"Operação": nome, "Chamadas": len(v), "Média (ms)": round(sum(d for d, _ in v) / len(v), 1),
+                   "p95 (ms)": round(percentil([d for d, _ in v], 95), 1), "Máx (ms)": round(max(d for d, _ in v), 1),
+                   "Bytes (total)": sum(t for _, t in v)} for nome, v in por_op.items()]
+        return sorted(linhas, key=lambda l: -l["Máx (ms)"])[:limite]
+
+
+class RepositorioInstrumentado:
+    """Envolve qualquer repositório (Supabase ou local) e registra cada chamada no Medidor."""
+
+    def __init__(self, repo, medidor):
+        self._repo = repo
+        self._medidor = medidor
+        self._cache = {}
+
+    def __getattr__(self, nome):
+        alvo = getattr(self._repo, nome)
+        if not callable(alvo): return alvo
+        if nome not in self._cache:
+            if nome.startswith("iterar_"): self._cache[nome] = self._embrulhar_gerador(nome, alvo)
+            else: self._cache[nome] = self._medidor.embrulhar(f"repo.{nome}", alvo, rede=True)
+        return self._cache[nome]
+
+    def _embrulhar_gerador(self, nome, fn):
+        def medido(*args, **kwargs):
+            gen = fn(*args, **kwargs)
+            while True:  # cada página é uma ida ao backend
+                t0 = time.perf_counter()
+                try: pagina = next(gen)
+                except StopIteration: return
+                self._medidor.registrar(f"repo.{nome}", time.perf_counter() - t0, _tamanho(pagina), True)
+                yield pagina
+        return medido
@@ -0,0 +1,404 @@
+# --- CAMADA DE ACESSO A DADOS DO AEE CONECTA ---
+# Toda leitura/gravação do app passa por um "repositório". Há duas implementações intercambiáveis:
+#   RepositorioSupabase -> o projeto Supabase de produção (tabelas + buckets do Storage)
+#   RepositorioLocal    -> SQLite + pastas no disco, para rodar e medir o app numa máquina só, sem rede
+# As duas devolvem listas de dicts com as mesmas colunas, então o app não sabe qual está em uso.
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+TABELAS = ["relatorios", "logs", "credenciais", "estudantes", "professores"]
+BUCKETS = ["fotos_perfil", "fotos_aee"]
+CHAVES = {"relatorios": "id", "logs": "id", "credenciais": "rf", "professores": "rf", "estudantes": "registro"}
+TAMANHO_PAGINA = 1000  # o PostgREST corta cada resposta em 1000 linhas
+
+
+def ler_instante(texto):
+    """datetime de um timestamp ISO vindo do banco ou do Storage. O PostgREST corta os zeros finais da fração
+    ('...00.07412+00:00') e o fromisoformat do Python até 3.10 só aceita 3 ou 6 casas e não aceita 'Z'."""
+    base, fracao, sinal, hh, mm = re.fullmatch(r"([^.]*?)(?:\.(\d+))?(?:([+-])(\d\d):?(\d\d)|Z)?", str(texto).strip()).groups()
+    fuso = f"{sinal}{hh}:{mm}" if sinal else ("+00:00" if str(texto).strip().endswith("Z") else "")
+    return datetime.fromisoformat(f"{base}.{(fracao or '').ljust(6, '0')[:6]}{fuso}")
+
+
+class RepositorioSupabase:
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    def _paginado(self, montar_query, tamanho=TAMANHO_PAGINA):
+        linhas, inicio = [], 0
+        while True:
+            pagina = montar_query().range(inicio, inicio + tamanho - 1).execute().data
+            linhas.extend(pagina)
+            if len(pagina) < tamanho: return linhas
+            inicio += tamanho
+
+    # --- professores / credenciais ---
+    def listar_professores(self):
+        return self.cliente.table("professores").select("*").execute().data
+
+    def inserir_professor(self, dados):
+        self.cliente.table("professores").insert(dados).execute()
+
+    def atualizar_professor(self, rf, dados):
+        self.cliente.table("professores").update(dados).eq("rf", rf).execute()
+
+    def excluir_professor(self, rf):
+        self.cliente.table("professores").delete().eq("rf", rf).execute()
+
+    def obter_senha_hash(self, rf):
+        res = self.cliente.table("credenciais").select("senha_hash").eq("rf", rf).execute().data
+        return res[0]['senha_hash'] if res else None
+
+    def inserir_credencial(self, rf, senha_hash):
+        self.cliente.table("credenciais").insert({"rf": rf, "senha_hash": senha_hash}).execute()
+
+    def excluir_credencial(self, rf):
+        self.cliente.table("credenciais").delete().eq("rf", rf).execute()
+
+    # --- estudantes ---
+    def listar_estudantes(self):
+        return self._paginado(lambda: self.cliente.table("estudantes").select("*").order("registro"))
+
+    def iterar_estudantes(self, colunas, tamanho=TAMANHO_PAGINA):
+        """Páginas por 'registro' crescente (keyset), como iterar_relatorios."""
+        ultimo = None
+        while True:
+            q = self.cliente.table("estudantes").select(colunas).order("registro").limit(tamanho)
+            if ultimo is not None: q = q.gt("registro", ultimo)
+            pagina = q.execute().data
+            if pagina: yield pagina
+            if len(pagina) < tamanho: return
+            ultimo = pagina[-1]['registro']
+
+    def salvar_estudantes(self, linhas):
+        self.cliente.table("estudantes").upsert(linhas).execute()
+
+    def excluir_estudante(self, registro):
+        self.cliente.table("estudantes").delete().eq("registro", registro).execute()
+
+    # --- relatórios ---
+    def listar_relatorios(self, registro_aluno=None, rf_professor=None, bimestre=None, registros=None, colunas="*"):
+        def q():
+            q = self.cliente.table("relatorios").select(colunas).order("id")
+            if registro_aluno is not None: q = q.eq("registro_aluno", registro_aluno)
+            if rf_professor is not None: q = q.eq("rf_professor", rf_professor)
+            if bimestre is not None: q = q.eq("bimestre", bimestre)
+            if registros is not None: q = q.in_("registro_aluno", list(registros))
+            return q
+        return self._paginado(q)
+
+    def iterar_relatorios(self, colunas, tamanho=TAMANHO_PAGINA):
+        """Páginas por 'id' crescente (keyset): o custo de cada página não cresce com a posição na tabela."""
+        ultimo = None
+        while True:
+            q = self.cliente.table("relatorios").select(colunas).order("id").limit(tamanho)
+            if ultimo is not None: q = q.gt("id", ultimo)
+            pagina = q.execute().data
+            if pagina: yield pagina
+            if len(pagina) < tamanho: return
+            ultimo = pagina[-1]['id']
+
+    def relatorios_alterados_desde(self, marca, colunas="*"):
+        """Linhas criadas ou alteradas a partir de 'marca' (atualizado_em é mantido por trigger no banco)."""
+        return self._paginado(lambda: self.cliente.table("relatorios").select(colunas)
+                              .gte("atualizado_em", marca).order("atualizado_em").order("id"))
+
+    def exclusoes_desde(self, marca):
+        """Lápides de relatorios_excluidos (id, excluido_em) a partir de 'marca'."""
+        return self._paginado(lambda: self.cliente.table("relatorios_excluidos").select("id, excluido_em")
+                              .gte("excluido_em", marca).order("excluido_em").order("id"))
+
+    def gravar_relatorios(self, linhas):
+        """Upsert idempotente pela chave_envio: reenviar o mesmo lote não duplica registros."""
+        self.cliente.table("relatorios").upsert(linhas, on_conflict="chave_envio", ignore_duplicates=True).execute()
+
+    def obter_relatorio(self, id_rel):
+        res = self.cliente.table("relatorios").select("*").eq("id", id_rel).execute().data
+        return res[0] if res else None
+
+    def atualizar_relatorio(self, id_rel, dados):
+        self.cliente.table("relatorios").update(dados).eq("id", id_rel).execute()
+
+    def excluir_relatorio(self, id_rel):
+        self.cliente.table("relatorios").delete().eq("id", id_rel).execute()
+
+    # --- logs / manutenção ---
+    def registrar_logs(self, linhas):
+        self.cliente.table("logs").insert(linhas).execute()
+
+    def resumo_logs_semanal(self, desde):
+        """Eventos por semana, professor e ação, já somados no banco (view logs_semanal)."""
+        return self._paginado(lambda: self.cliente.table("logs_semanal").select("semana, rf, acao, total").gte("semana", desde).order("semana"))
+
+    def limpar_tudo(self):
+        for t in TABELAS:
+            self.cliente.table(t).delete().neq(CHAVES[t], "xxx").execute()
+
+    # --- Storage ---
+    def baixar_foto(self, bucket, caminho):
+        return self.cliente.storage.from_(bucket).download(caminho)
+
+    def gravar_foto(self, bucket, caminho, dados, tipo, upsert=False):
+        opcoes = {"content-type": tipo}
+        if upsert: opcoes["upsert"] = "true"
+        self.cliente.storage.from_(bucket).upload(caminho, dados, opcoes)
+
+    def remover_fotos(self, bucket, caminhos):
+        self.cliente.storage.from_(bucket).remove(list(caminhos))
+
+    def iterar_fotos(self, bucket, tamanho=TAMANHO_PAGINA):
+        """Páginas de {nome, bytes, criado_em (epoch)} da raiz do bucket, em ordem de nome."""
+        inicio = 0
+        while True:
+            itens = self.cliente.storage.from_(bucket).list("", {"limit": tamanho, "offset": inicio, "sortBy": {"column": "name", "order": "asc"}})
+            pagina = [{"nome": i["name"], "bytes": (i.get("metadata") or {}).get("size", 0),
+                       "criado_em": ler_instante(i["created_at"]).timestamp() if i.get("created_at") else 0}
+                      for i in itens if i.get("id")]  # sem id = pasta
+            if pagina: yield pagina
+            if len(itens) < tamanho: return
+            inicio += tamanho
+
+
+ESQUEMA_LOCAL = """
+CREATE TABLE IF NOT EXISTS professores (rf TEXT PRIMARY KEY, nome TEXT, perfil TEXT);
+CREATE TABLE IF NOT EXISTS credenciais (rf TEXT PRIMARY KEY, senha_hash TEXT);
+CREATE TABLE IF NOT EXISTS estudantes (
+    registro TEXT PRIMARY KEY, aluno TEXT, turma TEXT, necessidades TEXT, data_nascimento TEXT,
+    observacoes_gerais TEXT, foto_path TEXT);
+CREATE TABLE IF NOT EXISTS relatorios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    data TEXT, rf_professor TEXT, registro_aluno TEXT, bimestre TEXT, participou_aula TEXT,
+    motivo_nao_participou TEXT, disciplina_tema TEXT, planejado TEXT, realizado TEXT, participacao TEXT,
+    foto_path TEXT, chave_envio TEXT UNIQUE, atualizado_em TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')));
+CREATE INDEX IF NOT EXISTS ix_relatorios_aluno ON relatorios (registro_aluno);
+CREATE INDEX IF NOT EXISTS ix_relatorios_prof ON relatorios (rf_professor);
+CREATE INDEX IF NOT EXISTS ix_relatorios_atualizado ON relatorios (atualizado_em);
+CREATE TABLE IF NOT EXISTS relatorios_excluidos (id INTEGER PRIMARY KEY, excluido_em TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')));
+CREATE INDEX IF NOT EXISTS ix_relatorios_excluidos_em ON relatorios_excluidos (excluido_em);
+CREATE TRIGGER IF NOT EXISTS tg_relatorios_inserido AFTER INSERT ON relatorios WHEN NEW.atualizado_em IS NULL BEGIN
+    UPDATE relatorios SET atualizado_em = strftime('%Y-%m-%dT%H:%M:%f', 'now') WHERE id = NEW.id; END;
+CREATE TRIGGER IF NOT EXISTS tg_relatorios_alterado AFTER UPDATE ON relatorios WHEN NEW.atualizado_em IS OLD.atualizado_em BEGIN
+    UPDATE relatorios SET atualizado_em = strftime('%Y-%m-%dT%H:%M:%f', 'now') WHERE id = NEW.id; END;
+CREATE TRIGGER IF NOT EXISTS tg_relatorios_excluido AFTER DELETE ON relatorios BEGIN
+    INSERT OR REPLACE INTO relatorios_excluidos (id) VALUES (OLD.id); END;
+CREATE TABLE IF NOT EXISTS logs (id INTEGER PRIMARY KEY AUTOINCREMENT, rf TEXT, data_hora TEXT, acao TEXT DEFAULT 'login', semana TEXT, detalhe TEXT);
+CREATE INDEX IF NOT EXISTS ix_logs_semana ON logs (semana, rf);
+"""
+
+# Colunas acrescentadas depois da primeira versão: (tabela, coluna, tipo, preenchimento das linhas antigas)
+MIGRACOES_LOCAIS = [
+    ("relatorios", "atualizado_em", "TEXT", "strftime('%Y-%m-%dT%H:%M:%f', 'now')"),
+    ("logs", "acao", "TEXT DEFAULT 'login'", None),
+    ("logs", "semana", "TEXT",  # segunda-feira da semana de data_hora (dd/mm/aaaa hh:mm:ss)
+     "date(substr(data_hora, 7, 4) || '-' || substr(data_hora, 4, 2) || '-' || substr(data_hora, 1, 2), 'weekday 0', '-6 days')"),
+    ("logs", "detalhe", "TEXT", None),
+]
+
+
+class RepositorioLocal:
+    """Mesmo contrato do RepositorioSupabase, gravando num arquivo SQLite e numa pasta por bucket."""
+
+    def __init__(self, arquivo_db, pasta_storage):
+        self.arquivo_db = arquivo_db
+        self.pasta_storage = pasta_storage
+        self._local = threading.local()  # uma conexão por thread (a fila de envio usa threads)
+        for b in BUCKETS: os.makedirs(os.path.join(pasta_storage, b), exist_ok=True)
+        con = self._con()
+        for tabela, coluna, tipo, preencher in MIGRACOES_LOCAIS:  # bancos criados por versões anteriores
+            colunas = {r[1] for r in con.execute(f"PRAGMA table_info({tabela})")}
+            if colunas and coluna not in colunas:
+                con.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}")
+                if preencher: con.execute(f"UPDATE {tabela} SET {coluna} = {preencher}")
+        con.executescript(ESQUEMA_LOCAL)
+
+    def _con(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.arquivo_db, timeout=30, isolation_level=None)
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA journal_mode=WAL")
+            self._local.con = con
+        return con
+
+    def _select(self, sql, params=()):
+        return [dict(r) for r in self._con().execute(sql, params).fetchall()]
+
+    def _upsert(self, tabela, linhas, conflito, ignorar=False):
+        if isinstance(linhas, dict): linhas = [linhas]
+        if not linhas: return
+        cols = list(linhas[0])
+        acao = "NOTHING" if ignorar else "UPDATE SET " + ", ".join(f"{c} = excluded.{c}" for c in cols if c != conflito)
+        sql = f"INSERT INTO {tabela} ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)}) ON CONFLICT ({conflito}) DO {acao}"
+        con = self._con()
+        with con:
+            con.execute("BEGIN")
+            con.executemany(sql, [tuple(l.get(c) for c in cols) for l in linhas])
+
+    def _insert(self, tabela, linhas):
+        if isinstance(linhas, dict): linhas = [linhas]
+        if not linhas: return
+        cols = list(linhas[0])
+        con = self._con()
+        with con:
+            con.execute("BEGIN")
+            con.executemany(f"INSERT INTO {tabela} ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})",
+                            [tuple(l.get(c) for c in cols) for l in linhas])
+
+    def _update(self, tabela, chave, valor, dados):
+        sets = ", ".join(f"{c} = ?" for c in dados)
+        self._con().execute(f"UPDATE {tabela} SET {sets} WHERE {chave} = ?", (*dados.values(), valor))
+
+    def _delete(self, tabela, chave, valor):
+        self._con().execute(f"DELETE FROM {tabela} WHERE {chave} = ?", (valor,))
+
+    # --- professores / credenciais ---
+    def listar_professores(self):
+        return self._select("SELECT * FROM professores")
+
+    def inserir_professor(self, dados):
+        self._insert("professores", dados)
+
+    def atualizar_professor(self, rf, dados):
+        self._update("professores", "rf", rf, dados)
+
+    def excluir_professor(self, rf):
+        self._delete("professores", "rf", rf)
+
+    def obter_senha_hash(self, rf):
+        res = self._select("SELECT senha_hash FROM credenciais WHERE rf = ?", (rf,))
+        return res[0]['senha_hash'] if res else None
+
+    def inserir_credencial(self, rf, senha_hash):
+        self._insert("credenciais", {"rf": rf, "senha_hash": senha_hash})
+
+    def excluir_credencial(self, rf):
+        self._delete("credenciais", "rf", rf)
+
+    # --- estudantes ---
+    def listar_estudantes(self):
+        return self._select("SELECT * FROM estudantes")
+
+    def iterar_estudantes(self, colunas, tamanho=TAMANHO_PAGINA):
+        ultimo = ""
+        while True:
+            pagina = self._select(f"SELECT {colunas} FROM estudantes WHERE registro > ? ORDER BY registro LIMIT ?", (ultimo, tamanho))
+            if pagina: yield pagina
+            if len(pagina) < tamanho: return
+            ultimo = pagina[-1]['registro']
+
+    def salvar_estudantes(self, linhas):
+        self._upsert("estudantes", linhas, "registro")
+
+    def excluir_estudante(self, registro):
+        self._delete("estudantes", "registro", registro)
+
+    # --- relatórios ---
+    def listar_relatorios(self, registro_aluno=None, rf_professor=None, bimestre=None, registros=None, colunas="*"):
+        filtros, params = [], []
+        for col, val in (("registro_aluno", registro_aluno), ("rf_professor", rf_professor), ("bimestre", bimestre)):
+            if val is not None: filtros.append(f"{col} = ?"); params.append(val)
+        if registros is not None:
+            registros = list(registros)
+            filtros.append(f"registro_aluno IN ({', '.join('?' for _ in registros)})"); params.extend(registros)
+        where = f" WHERE {' AND '.join(filtros)}" if filtros else ""
+        return self._select(f"SELECT {colunas} FROM relatorios{where} ORDER BY id", params)
+
+    def iterar_relatorios(self, colunas, tamanho=TAMANHO_PAGINA):
+        ultimo = 0
+        while True:
+            pagina = self._select(f"SELECT {colunas} FROM relatorios WHERE id > ? ORDER BY id LIMIT ?", (ultimo, tamanho))
+            if pagina: yield pagina
+            if len(pagina) < tamanho: return
+            ultimo = pagina[-1]['id']
+
+    def relatorios_alterados_desde(self, marca, colunas="*"):
+        return self._select(f"SELECT {colunas} FROM relatorios WHERE atualizado_em >= ? ORDER BY atualizado_em, id", (marca,))
+
+    def exclusoes_desde(self, marca):
+        return self._select("SELECT id, excluido_em FROM relatorios_excluidos WHERE excluido_em >= ? ORDER BY excluido_em, id", (marca,))
+
+    def gravar_relatorios(self, linhas):
+        self._upsert("relatorios", linhas, "chave_envio", ignorar=True)
+
+    def obter_relatorio(self, id_rel):
+        res = self._select("SELECT * FROM relatorios WHERE id = ?", (id_rel,))
+        return res[0] if res else None
+
+    def atualizar_relatorio(self, id_rel, dados):
+        self._update("relatorios", "id", id_rel, dados)
+
+    def excluir_relatorio(self, id_rel):
+        self._delete("relatorios", "id", id_rel)
+
+    # --- logs / manutenção ---
+    def registrar_logs(self, linhas):
+        self._insert("logs", linhas)
+
+    def resumo_logs_semanal(self, desde):
+        return self._select("""SELECT semana, rf, acao, COUNT(*) AS total FROM logs WHERE semana >= ?
+                               GROUP BY semana, rf, acao ORDER BY semana""", (desde,))
+
+    def limpar_tudo(self):
+        con = self._con()
+        with con:
+            con.execute("BEGIN")
+            for t in TABELAS: con.execute(f"DELETE FROM {t}")
+
+    # --- Storage ---
+    def _arquivo(self, bucket, caminho):
+        return os.path.join(self.pasta_storage, bucket, os.path.basename(caminho))
+
+    def baixar_foto(self, bucket, caminho):
+        with open(self._arquivo(bucket, caminho), "rb") as f: return f.read()
+
+    def gravar_foto(self, bucket, caminho, dados, tipo, upsert=False):
+        arq = self._arquivo(bucket, caminho)
+        if not upsert and os.path.exists(arq): raise FileExistsError(f"{bucket}/{caminho} já existe")
+        tmp = f"{arq}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f: f.write(dados)
+        os.replace(tmp, arq)
+
+    def remover_fotos(self, bucket, caminhos):
+        for c in caminhos:
+            try: os.remove(self._arquivo(bucket, c))
+            except FileNotFoundError: pass
+
+    def iterar_fotos(self, bucket, tamanho=TAMANHO_PAGINA):
+        with os.scandir(os.path.join(self.pasta_storage, bucket)) as it:
+            arquivos = sorted((e for e in it if e.is_file() and not e.name.endswith(".tmp")), key=lambda e: e.name)
+        for i in range(0, len(arquivos), tamanho):
+            pagina = []
+            for e in arquivos[i:i + tamanho]:
+                try: info = e.stat()
+                except FileNotFoundError: continue
+                pagina.append({"nome": e.name, "bytes": info.st_size, "criado_em": info.st_mtime})
+            if pagina: yield pagina
+
+    # --- carga inicial ---
+    def semear(self, planilha, pasta_fotos):
+        """Carrega professores e estudantes do cadastro_AEE.xlsx e as fotos de fotos_alunos/<registro>.jpg."""
+        import pandas as pd
+        abas = pd.read_excel(planilha, sheet_name=None, dtype=str)
+        df_a = abas.get("alunos", list(abas.values())[-1]).dropna(subset=["registro"]).fillna("")
+        df_p = next(df for nome, df in abas.items() if nome != "alunos").dropna(subset=["rf"]).fillna("")
+        self._upsert("professores", [
+            {"rf": r['rf'].strip(), "nome": r['professor'].strip(), "perfil": r['perfil'].strip().lower()}
+            for _, r in df_p.drop_duplicates("rf").iterrows()], "rf")
+        alunos = []
+        for _, r in df_a.iterrows():
+            reg = r['registro'].strip()
+            foto = os.path.join(pasta_fotos, r.get('foto') or f"{reg}.jpg")
+            foto_path = ""
+            if os.path.isfile(foto):
+                foto_path = f"perfil_{reg}.jpg"
+                with open(foto, "rb") as f: self.gravar_foto("fotos_perfil", foto_path, f.read(), "image/jpeg", upsert=True)
+            alunos.append({"registro": reg, "aluno": r['aluno'].strip(), "turma": r['turma'].strip(), "necessidades": r.get('necessidades', ""),
+                           "data_nascimento": r.get('data_nascimento', ""), "observacoes_gerais": r.get('observacoes_gerais', ""), "foto_path": foto_path})
+        self._upsert("estudantes", alunos, "registro")
+
+    def semear_se_vazio(self, planilha, pasta_fotos):
+        if not self._select("SELECT 1 FROM professores LIMIT 1") and os.path.isfile(planilha):
+            self.semear(planilha, pasta_fotos)
@@ -0,0 +1,37 @@
+-- Alterações de esquema exigidas pelo app, em ordem. Rode no SQL Editor do Supabase.
+
+-- Fila de envio: chave de idempotência dos relatórios (upsert on_conflict=chave_envio)
+alter table relatorios add column if not exists chave_envio text;
+create unique index if not exists relatorios_chave_envio_key on relatorios (chave_envio);
+
+-- Cache de leitura dos relatórios: marca d'água de alteração e lápides de exclusão (sincronização por delta).
+-- Os triggers valem para qualquer cliente que grave na tabela, não só para o app.
+alter table relatorios add column if not exists atualizado_em timestamptz not null default now();
+create index if not exists relatorios_atualizado_em_idx on relatorios (atualizado_em, id);
+
+create table if not exists relatorios_excluidos (id bigint primary key, excluido_em timestamptz not null default now());
+create index if not exists relatorios_excluidos_em_idx on relatorios_excluidos (excluido_em);
+
+create or replace function relatorios_marca_alteracao() returns trigger language plpgsql as $$
+begin new.atualizado_em := now(); return new; end $$;
+drop trigger if exists relatorios_marca_alteracao on relatorios;
+create trigger relatorios_marca_alteracao before insert or update on relatorios
+    for each row execute function relatorios_marca_alteracao();
+
+create or replace function relatorios_registra_exclusao() returns trigger language plpgsql as $$
+begin
+    insert into relatorios_excluidos (id) values (old.id) on conflict (id) do update set excluido_em = now();
+    return old;
+end $$;
+drop trigger if exists relatorios_registra_exclusao on relatorios;
+create trigger relatorios_registra_exclusao after delete on relatorios
+    for each row execute function relatorios_registra_exclusao();
+
+-- Registro de auditoria: tipo do evento, semana (segunda-feira) e detalhe; a view soma no banco para o painel.
+alter table logs add column if not exists acao text not null default 'login';
+alter table logs add column if not exists semana date;
+alter table logs add column if not exists detalhe text;
+update logs set semana = date_trunc('week', to_timestamp(data_hora, 'DD/MM/YYYY HH24:MI:SS'))::date where semana is null;
+create index if not exists logs_semana_idx on logs (semana, rf);
+create or replace view logs_semanal as
+    select semana, rf, acao, count(*) as total from logs group by semana, rf, acao;
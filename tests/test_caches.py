@@ -0,0 +1,98 @@
+# Verificações dos caches compartilhados (caches.py) contra o RepositorioLocal. Rode com: python -m pytest -q
+import os
+import sys
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from caches import CacheRelatorios, CacheFotos, MemoDocumentos  # noqa: E402
+from repositorio import RepositorioLocal, ler_instante  # noqa: E402
+
+
+def _relatorio(reg, data, tema, rf="1"):
+    return {"data": data, "rf_professor": rf, "registro_aluno": reg, "bimestre": "1º Bimestre", "participou_aula": "Sim",
+            "motivo_nao_participou": "", "disciplina_tema": tema, "planejado": "p", "realizado": "r", "participacao": "", "foto_path": ""}
+
+
+def _ids(cache, reg, rf=None):
+    return [l["id"] for l in cache.do_aluno(reg, rf)]
+
+
+def test_delta_aplica_alteracoes_e_lapides(tmp_path):
+    repo = RepositorioLocal(str(tmp_path / "aee.db"), str(tmp_path / "storage"))
+    repo.gravar_relatorios([_relatorio("1", "01/03/2026", "A"), _relatorio("1", "02/03/2026", "B", rf="2"), _relatorio("2", "01/03/2026", "C")])
+    cache = CacheRelatorios(repo, intervalo=3600)
+    vistos = []
+    cache.assinar(lambda alterados, excluidos, recarga: vistos.append((len(alterados), len(excluidos), recarga)))
+    assert _ids(cache, "1") == [1, 2] and _ids(cache, "1", "2") == [2]
+    assert vistos == [(0, 0, True), (3, 0, True)]  # entrega inicial vazia + primeira carga completa
+    marca = cache.marca
+
+    repo.atualizar_relatorio(1, {"disciplina_tema": "A corrigido", "registro_aluno": "2"})
+    repo.excluir_relatorio(3)
+    repo.gravar_relatorios([_relatorio("1", "03/03/2026", "D")])
+    cache.sincronizar()  # dentro do intervalo e sem gravação do app: não busca
+    assert _ids(cache, "2") == [3]
+    cache.marcar_sujo(); cache.sincronizar()
+    assert _ids(cache, "1") == [2, 4] and _ids(cache, "2") == [1]
+    assert cache.linhas[1]["disciplina_tema"] == "A corrigido" and 3 not in cache.linhas
+    assert vistos[-1][2] is False and cache.marca > marca
+
+
+def test_marcas_do_postgrest_com_fracao_curta():
+    # O PostgREST corta os zeros finais da fração; o fromisoformat do Python 3.10 recusa esse formato
+    class RepoPostgrest:
+        def __init__(self): self.pedidos, self.lotes = [], [[{"id": 2, "atualizado_em": "2026-03-01T10:00:01.5+00:00"}]]
+        def iterar_relatorios(self, colunas): yield [{"id": 1, "atualizado_em": "2026-03-01T10:00:00.07412+00:00"}]
+        def relatorios_alterados_desde(self, desde): self.pedidos.append(desde); return self.lotes.pop() if self.lotes else []
+        def exclusoes_desde(self, desde): return [{"id": 1, "excluido_em": "2026-03-01T10:00:01.25Z"}]
+    repo = RepoPostgrest()
+    cache = CacheRelatorios(repo)
+    cache.sincronizar(); cache.marcar_sujo(); cache.sincronizar(); cache.marcar_sujo(); cache.sincronizar()
+    assert repo.pedidos == ["2026-03-01T09:59:00.074120+00:00", "2026-03-01T09:59:01.500000+00:00"]
+    assert cache.marca == "2026-03-01T10:00:01.5+00:00" and list(cache.linhas) == [2]
+    assert ler_instante("2026-03-01T10:00:00.123Z") == ler_instante("2026-03-01T10:00:00.123000+00:00")
+
+
+def test_resumo_limita_a_pagina_existente(tmp_path):
+    repo = RepositorioLocal(str(tmp_path / "aee.db"), str(tmp_path / "storage"))
+    repo.gravar_relatorios([_relatorio("1", f"{d:02d}/03/2026", f"T{d}") for d in range(1, 6)])
+    cache = CacheRelatorios(repo)
+    total, pagina, itens = cache.resumo_do_aluno("1", pagina=2, por_pagina=2)
+    assert (total, pagina, [r["disciplina_tema"] for r in itens]) == (5, 2, ["T1"])
+    repo.excluir_relatorio(1); cache.marcar_sujo()
+    total, pagina, itens = cache.resumo_do_aluno("1", pagina=2, por_pagina=2)
+    assert (total, pagina, [r["disciplina_tema"] for r in itens]) == (4, 1, ["T3", "T2"])
+
+
+def test_cache_de_fotos_lru_e_invalidacao(tmp_path):
+    from PIL import Image
+    buf = BytesIO(); Image.new("RGB", (800, 600), "red").save(buf, "JPEG"); foto = buf.getvalue()
+    baixados = []
+    def baixar(bucket, caminho):
+        baixados.append(caminho)
+        return foto if caminho.endswith(".jpg") else b"x" * 100
+    cache = CacheFotos(str(tmp_path / "cache"), 250, baixar)
+    assert cache.original("fotos_aee", "a.bin") == b"x" * 100
+    cache.original("fotos_aee", "a.bin"); cache.original("fotos_aee", "b.bin")
+    cache.original("fotos_aee", "a.bin")  # "a" passa a ser o mais recente
+    cache.original("fotos_aee", "c.bin")  # estoura o limite: sai "b"
+    assert baixados == ["a.bin", "b.bin", "c.bin"] and cache.total == 200
+    cache.original("fotos_aee", "b.bin")
+    assert baixados[-1] == "b.bin"
+    cache.invalidar("fotos_aee", "c.bin"); cache.original("fotos_aee", "c.bin")
+    assert baixados[-1] == "c.bin"
+
+    cache = CacheFotos(str(tmp_path / "cache2"), 10 * 1024 * 1024, baixar)
+    assert Image.open(BytesIO(cache.miniatura("fotos_perfil", "p.jpg"))).size == (200, 150)
+    assert len(CacheFotos(str(tmp_path / "cache2"), 10 * 1024 * 1024, baixar).indice) == 2  # reabre o que já estava no disco
+
+
+def test_memo_de_documentos_respeita_o_limite():
+    memo = MemoDocumentos(250)
+    gerados = []
+    def gerar(nome):
+        gerados.append(nome)
+        return nome.encode() * 100
+    for nome in ("a", "b", "a", "c"): memo.obter(nome, lambda: gerar(nome))
+    assert gerados == ["a", "b", "c"] and memo.total == 200
+    assert memo.consultar("b") is None and memo.consultar("a") is not None
@@ -0,0 +1,26 @@
+# Verificações da coleta de fotos órfãs (coleta_fotos.py). Rode com: python -m pytest -q
+import os
+import sys
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import repositorio  # noqa: E402
+from coleta_fotos import fotos_referenciadas, levantar_orfaos  # noqa: E402
+
+
+def test_referencias_de_todas_as_paginas(tmp_path):
+    repo = repositorio.RepositorioLocal(str(tmp_path / "aee.db"), str(tmp_path / "storage"))
+    paginas = []
+    iterar = repo.iterar_estudantes
+    repo.iterar_estudantes = lambda colunas: (paginas.append(p) or p for p in partial(iterar, tamanho=3)(colunas))
+    repo.salvar_estudantes([{"registro": f"{i:04d}", "aluno": f"A{i}", "turma": "1A", "foto_path": f"perfil_{i:04d}.jpg"} for i in range(10)])
+    for i in range(10):
+        repo.gravar_foto("fotos_perfil", f"perfil_{i:04d}.jpg", b"x", "image/jpeg")
+        os.utime(os.path.join(str(tmp_path / "storage"), "fotos_perfil", f"perfil_{i:04d}.jpg"), (0, 0))
+    repo.gravar_foto("fotos_perfil", "perfil_orfa.jpg", b"xy", "image/jpeg")
+    os.utime(os.path.join(str(tmp_path / "storage"), "fotos_perfil", "perfil_orfa.jpg"), (0, 0))
+
+    assert len(fotos_referenciadas(repo)) == 10
+    assert [len(p) for p in paginas] == [3, 3, 3, 1]
+    orfaos = levantar_orfaos(repo)
+    assert [f["nome"] for f in orfaos["fotos_perfil"]] == ["perfil_orfa.jpg"]
@@ -0,0 +1,103 @@
+# Verificações da fila local de envio (fila_envio.py) contra o RepositorioLocal. Rode com: python -m pytest -q
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fila_envio import FilaEnvio, MAX_RECUSAS_SEM_SUCESSO  # noqa: E402
+from repositorio import RepositorioLocal  # noqa: E402
+
+
+def _relatorio(reg, **extra):
+    return {"data": "03/05/2026", "rf_professor": "1", "registro_aluno": reg, "bimestre": "1º Bimestre", "participou_aula": "Sim",
+            "motivo_nao_participou": "", "disciplina_tema": "Tema", "planejado": "p", "realizado": "r", "participacao": "", "foto_path": "", **extra}
+
+
+def _montar(tmp_path):
+    repo = RepositorioLocal(str(tmp_path / "aee.db"), str(tmp_path / "storage"))
+    return repo, FilaEnvio(str(tmp_path / "fila.db"), repo)
+
+
+def _fila(fila, sql):
+    with sqlite3.connect(fila.caminho) as con:
+        return con.execute(sql).fetchall()
+
+
+def test_envia_fotos_e_relatorios(tmp_path):
+    repo, fila = _montar(tmp_path)
+    enviados = []
+    fila.ao_enviar = lambda: enviados.append(1)
+    fila.enfileirar([(_relatorio("1", foto_path="aula_1.jpg"), b"jpeg", "image/jpeg"), (_relatorio("2"), None, None)])
+    assert fila.contagem() == (2, 0)
+    assert fila.sincronizar() is False  # lote incompleto: nada mais a enviar
+    assert fila.contagem() == (0, 2) and enviados == [1]
+    assert sorted(r["registro_aluno"] for r in repo.listar_relatorios()) == ["1", "2"]
+    assert repo.baixar_foto("fotos_aee", "aula_1.jpg") == b"jpeg"
+    assert _fila(fila, "SELECT COUNT(*) FROM fila WHERE foto IS NOT NULL") == [(0,)]
+
+
+def test_reenvio_nao_duplica(tmp_path):
+    repo, fila = _montar(tmp_path)
+    fila.enfileirar([(_relatorio("1", chave_envio="abc"), None, None)])
+    fila.enfileirar([(_relatorio("1", chave_envio="abc"), None, None)])  # duplo clique no Salvar
+    fila.sincronizar()
+    _fila(fila, "UPDATE fila SET status = 'pendente'")  # resposta perdida depois do insert: o lote volta
+    fila.sincronizar()
+    assert len(repo.listar_relatorios()) == 1
+
+
+def test_falha_reagenda_com_espera(tmp_path):
+    repo, fila = _montar(tmp_path)
+    gravar = repo.gravar_relatorios
+    falhas = [ConnectionError("fora do ar")]
+    def instavel(linhas):
+        if falhas: raise falhas.pop()
+        gravar(linhas)
+    repo.gravar_relatorios = instavel
+    fila.enfileirar([(_relatorio("1"), None, None)])
+    assert fila.sincronizar() is False
+    assert _fila(fila, "SELECT status, tentativas, erro FROM fila") == [("pendente", 1, "fora do ar")]
+    fila.sincronizar()  # ainda dentro da espera: não tenta de novo
+    assert repo.listar_relatorios() == []
+    _fila(fila, "UPDATE fila SET proxima_tentativa = 0")
+    fila.sincronizar()
+    assert fila.contagem() == (0, 1) and len(repo.listar_relatorios()) == 1
+
+
+def test_foto_que_falha_segura_so_o_seu_relatorio(tmp_path):
+    repo, fila = _montar(tmp_path)
+    gravar_foto = repo.gravar_foto
+    def foto_instavel(bucket, caminho, *args, **kwargs):
+        if caminho == "ruim.jpg": raise OSError("upload falhou")
+        gravar_foto(bucket, caminho, *args, **kwargs)
+    repo.gravar_foto = foto_instavel
+    fila.enfileirar([(_relatorio("1", foto_path="ruim.jpg"), b"x", "image/jpeg"), (_relatorio("2", foto_path="boa.jpg"), b"y", "image/jpeg")])
+    fila.sincronizar()
+    assert [r["registro_aluno"] for r in repo.listar_relatorios()] == ["2"]
+    assert _fila(fila, "SELECT status, foto IS NOT NULL FROM fila ORDER BY criado_em, status") == [("enviado", 0), ("pendente", 1)]
+
+
+def test_linha_recusada_nao_segura_o_lote(tmp_path):
+    repo, fila = _montar(tmp_path)
+    gravar = repo.gravar_relatorios
+    def com_restricao(linhas):  # como o servidor: uma linha inválida derruba o insert inteiro
+        if any(l["registro_aluno"] == "ruim" for l in linhas): raise ValueError("constraint")
+        gravar(linhas)
+    repo.gravar_relatorios = com_restricao
+    fila.enfileirar([(_relatorio(r), None, None) for r in ("1", "2", "ruim", "3", "4")])
+    fila.sincronizar()
+    assert sorted(r["registro_aluno"] for r in repo.listar_relatorios()) == ["1", "2", "3", "4"]
+    assert fila.contagem() == (1, 4)
+    assert [(i["registro_aluno"], i["tentativas"], i["erro"]) for i in fila.com_erro()] == [("ruim", 1, "constraint")]
+
+
+def test_servidor_fora_do_ar_nao_divide_sem_fim(tmp_path):
+    repo, fila = _montar(tmp_path)
+    chamadas = []
+    def fora_do_ar(linhas):
+        chamadas.append(len(linhas)); raise ConnectionError("sem rede")
+    repo.gravar_relatorios = fora_do_ar
+    fila.enfileirar([(_relatorio(str(i)), None, None) for i in range(50)])
+    assert fila.sincronizar() is False
+    assert len(chamadas) == MAX_RECUSAS_SEM_SUCESSO
+    assert fila.contagem() == (50, 0) and _fila(fila, "SELECT DISTINCT tentativas, erro FROM fila") == [(1, "sem rede")]
@@ -0,0 +1,52 @@
+# Verificações da importação do cadastro (importacao.py). Rode com: python -m pytest -q
+import datetime
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from importacao import normalizar_cadastro, comparar, importar  # noqa: E402
+from repositorio import RepositorioLocal  # noqa: E402
+
+
+def _planilha():
+    return pd.DataFrame({"registro": ["1", "2", 3.0], "aluno": ["Ana", "Bruno", "Caio"], "turma": ["1a", "1 B", "1A"],
+                         "data_nascimento": ["2010-05-03", "03/05/2010", datetime.datetime(2011, 1, 2)]})
+
+
+def test_datas_iso_nao_trocam_dia_e_mes():
+    validos, problemas = normalizar_cadastro(_planilha())
+    assert validos["data_nascimento"].tolist() == ["03/05/2010", "03/05/2010", "02/01/2011"]
+    assert validos["registro"].tolist() == ["1", "2", "3"]
+    assert problemas.empty
+
+
+def test_comparar_com_tabela_vazia():
+    validos, _ = normalizar_cadastro(_planilha())
+    novos, alterados, inalterados = comparar(validos, pd.DataFrame())
+    assert len(novos) == 3 and alterados.empty and inalterados.empty
+    assert novos["foto_path_atual"].tolist() == ["", "", ""]
+
+
+def test_comparar_com_tabela_existente():
+    validos, _ = normalizar_cadastro(_planilha())
+    atual = pd.DataFrame([
+        {"registro": "1", "aluno": "Ana", "turma": "1A", "data_nascimento": "03/05/2010", "foto_path": "perfil_1.jpg"},
+        {"registro": "2", "aluno": "Bruno Velho", "turma": "1B", "data_nascimento": "", "foto_path": ""},
+    ])
+    novos, alterados, inalterados = comparar(validos, atual)
+    assert novos["registro"].tolist() == ["3"]
+    assert alterados["registro"].tolist() == ["2"]
+    assert inalterados["registro"].tolist() == ["1"]
+    assert inalterados["foto_path_atual"].tolist() == ["perfil_1.jpg"]
+
+
+def test_importar_grava_no_repositorio_local(tmp_path):
+    repo = RepositorioLocal(str(tmp_path / "aee.db"), str(tmp_path / "storage"))
+    validos, _ = normalizar_cadastro(_planilha())
+    res = importar(repo, *comparar(validos, pd.DataFrame(repo.listar_estudantes())), str(tmp_path / "fotos"),
+                   normalizar=lambda b, l: (b, ".jpg", "image/jpeg"), largura_pol=2.5)
+    assert res["gravados"] == 3
+    novos, alterados, inalterados = comparar(validos, pd.DataFrame(repo.listar_estudantes()))
+    assert novos.empty and alterados.empty and len(inalterados) == 3